@@ -0,0 +1,62 @@
+from typing import Optional
+
+class JsonObjectScanner:
+    """Incremental brace matcher for the first JSON object in a text stream.
+    
+    Text can be fed piecewise as it arrives; string and escape state carry
+    across pieces so braces inside string values are ignored. Anything before
+    the first '{' is skipped.
+    """
+    
+    __slots__ = ("depth", "in_string", "escaped")
+    
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text: str, start: int = 0) -> int:
+        """Scan text from start; return the index just past the closing brace
+        of the first object, or -1 if it has not closed yet."""
+        depth = self.depth
+        in_string = self.in_string
+        escaped = self.escaped
+        if depth == 0:
+            start = text.find('{', start)
+            if start < 0:
+                return -1
+        
+        for i in range(start, len(text)):
+            c = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif c == '\\':
+                    escaped = True
+                elif c == '"':
+                    in_string = False
+            elif c == '"':
+                in_string = True
+            elif c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+                if depth == 0:
+                    self.depth, self.in_string, self.escaped = 0, False, False
+                    return i + 1
+        
+        self.depth, self.in_string, self.escaped = depth, in_string, escaped
+        return -1
+
+def find_balanced_json(text: str, start: int = 0) -> Optional[str]:
+    """Return the first brace-balanced JSON object in text, or None.
+    
+    Walks the text once, tracking string and escape state so braces inside
+    string values are ignored, and stops as soon as the object closes.
+    """
+    obj_start = text.find('{', start)
+    if obj_start < 0:
+        return None
+    
+    obj_end = JsonObjectScanner().feed(text, obj_start)
+    return text[obj_start:obj_end] if obj_end >= 0 else None
@@ -1,6 +1,8 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
+import sys
+import logging
 import threading
 import time
 from narrative_analyzer import analyze_video_with_gemini
@@ -26,6 +28,14 @@ from analyze_video import ensure_frontend_compatible_analysis
 import json
 from typing import Dict, Any
 
+# Modules log through their own loggers (levels set from env vars); give them
+# a stdout handler here so INFO output is not dropped under gunicorn/wsgi.py
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    stream=sys.stdout,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+
 app = Flask(__name__)
 #comment out the CORS middleware to avoid duplicate headers
 # Create an after_request handler to ensure CORS headers are properly set
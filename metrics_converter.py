@@ -1,24 +1,302 @@
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Union, Final
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
+import copy
 import json
 import re
+import threading
+from operator import itemgetter
+from cachetools import LRUCache
+import fastjsonschema
+from json_scanner import JsonObjectScanner, find_balanced_json
 
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_GEMINI_API_KEY"))
 
+_NUM_RE = re.compile(r'(\d+)')
+
+# Fallbacks for responses that are not bare JSON: a ```json fenced block, or
+# the outermost brace-delimited span
+_JSON_FENCE_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+_JSON_OBJECT_RE = re.compile(r'\{[\s\S]*\}')
+
+# Exact-match cache of parsed scoring responses keyed by the full prompt, so
+# retries and repeated descriptions skip the Gemini round-trip.
+_response_cache: LRUCache = LRUCache(maxsize=1024)
+_response_cache_lock = threading.Lock()
+
+# Instructions shared by every scoring call, set once on the model rather than
+# repeated in each prompt.
+_SCORING_SYSTEM_INSTRUCTION: Final[str] = (
+    "You score video analysis text for a marketing dashboard. Every score is an "
+    "integer from 0 to 100 (higher = better). Respond with only a JSON object "
+    "matching the example given in the prompt."
+)
+
+# Scoring prompt templates, built once at import. JSON example braces are
+# pre-escaped as {{ }} so format_map only substitutes the named field.
+_VIRAL_POTENTIAL_PROMPT: Final[str] = """Score, with brief reasoning, the viral criteria: visuals, emotional_impact, shareability, relatability, uniqueness; plus an overall_score weighing all factors.
+Viral potential analysis: {viral_description}
+Output JSON: {{"visuals": 75, "visuals_reasoning": "...", "emotional_impact": 80, "emotional_impact_reasoning": "...", "shareability": 85, "shareability_reasoning": "...", "relatability": 70, "relatability_reasoning": "...", "uniqueness": 65, "uniqueness_reasoning": "...", "overall_score": 75}}
+"""
+
+_PLATFORM_PROMPT: Final[str] = """Score expected performance on instagram, tiktok and youtube_shorts, and give 1-3 actionable recommendations.
+Platform analysis: {platform_text}
+Output JSON: {{"platform_scores": {{"instagram": 75, "tiktok": 80, "youtube_shorts": 70}}, "recommendations": ["..."]}}
+"""
+
+_HOOK_PROMPT: Final[str] = """Score this video hook for attention_grab, curiosity_gap, relevance, memorability and overall_score.
+Hook description: "{hook_text}"
+Output JSON: {{"attention_grab": 85, "curiosity_gap": 75, "relevance": 80, "memorability": 70, "overall_score": 78, "reasoning": "brief explanation"}}
+"""
+
+_EDITING_PROMPT: Final[str] = """Score this video editing for pacing, visual_coherence, technical_quality, engagement_impact and overall_score.
+Editing description: "{editing_text}"
+Output JSON: {{"pacing": 80, "visual_coherence": 75, "technical_quality": 85, "engagement_impact": 78, "overall_score": 80, "reasoning": "brief explanation"}}
+"""
+
+_VOICE_PROMPT: Final[str] = """Score this voice/tonality for clarity, energy_level, authenticity, audience_match and overall_score.
+Voice description: "{voice_text}"
+Output JSON: {{"clarity": 85, "energy_level": 75, "authenticity": 80, "audience_match": 78, "overall_score": 80, "reasoning": "brief explanation"}}
+"""
+
+# Viral criteria as (display name, key in Gemini "Scores"/"Reasoning",
+# LLM scoring key, LLM reasoning key, default description).
+_VIRAL_CRITERIA: Final = (
+    ("Visuals", "Visuals", "visuals", "visuals_reasoning", "Visual quality assessment"),
+    ("Emotional Impact", "Emotional_Impact", "emotional_impact", "emotional_impact_reasoning", "Emotional impact assessment"),
+    ("Shareability", "Shareability", "shareability", "shareability_reasoning", "Shareability assessment"),
+    ("Relatability", "Relatability", "relatability", "relatability_reasoning", "Relatability assessment"),
+    ("Uniqueness", "Uniqueness", "uniqueness", "uniqueness_reasoning", "Uniqueness assessment"),
+)
+
+# Every key the scoring prompts ask to be scored, at any nesting level
+_SCORE_KEYS: Final = frozenset({
+    "visuals", "emotional_impact", "shareability", "relatability", "uniqueness", "overall_score",
+    "instagram", "tiktok", "youtube_shorts",
+    "attention_grab", "curiosity_gap", "relevance", "memorability",
+    "pacing", "visual_coherence", "technical_quality", "engagement_impact",
+    "clarity", "energy_level", "authenticity", "audience_match",
+})
+_NUMERIC_STRING_RE = re.compile(r'\s*(\d+(?:\.\d+)?)\s*%?\s*')
+
+def _coerce_score_strings(result: Dict[str, Any]) -> None:
+    """Turn numeric-string scores ("75", "75%") into numbers, in place."""
+    for key, value in result.items():
+        if isinstance(value, dict):
+            _coerce_score_strings(value)
+        elif isinstance(value, str) and key in _SCORE_KEYS:
+            match = _NUMERIC_STRING_RE.fullmatch(value)
+            if match:
+                number = match.group(1)
+                result[key] = float(number) if "." in number else int(number)
+
+def _scores_schema(*keys: str) -> Dict[str, Any]:
+    """JSON schema requiring each key to be present with a numeric score."""
+    return {
+        "type": "object",
+        "required": list(keys),
+        "properties": {key: {"type": "number"} for key in keys}
+    }
+
+# Compiled once at import. Numeric strings such as "75" or "75%" are coerced
+# to numbers first (_coerce_score_strings); a response that still lacks a
+# score or carries a non-numeric one is logged and discarded, and the caller
+# falls back to its default scores.
+_VIRAL_VALIDATOR = fastjsonschema.compile(_scores_schema(
+    "visuals", "emotional_impact", "shareability", "relatability", "uniqueness", "overall_score"
+))
+_PLATFORM_VALIDATOR = fastjsonschema.compile({
+    "type": "object",
+    "required": ["platform_scores"],
+    "properties": {
+        "platform_scores": _scores_schema("instagram", "tiktok", "youtube_shorts"),
+        "recommendations": {"type": "array", "items": {"type": "string"}}
+    }
+})
+_HOOK_VALIDATOR = fastjsonschema.compile(_scores_schema(
+    "attention_grab", "curiosity_gap", "relevance", "memorability", "overall_score"
+))
+_EDITING_VALIDATOR = fastjsonschema.compile(_scores_schema(
+    "pacing", "visual_coherence", "technical_quality", "engagement_impact", "overall_score"
+))
+_VOICE_VALIDATOR = fastjsonschema.compile(_scores_schema(
+    "clarity", "energy_level", "authenticity", "audience_match", "overall_score"
+))
+
+# Descriptions shorter than this are not worth a model round-trip
+_MIN_SCORABLE_TEXT_LEN = 20
+
+# Fallback scores returned when there is nothing to score or the model
+# response is unusable.
+_VIRAL_DEFAULTS: Final[Dict[str, Any]] = {
+    "visuals": 70,
+    "visuals_reasoning": "Default score due to insufficient information",
+    "emotional_impact": 70,
+    "emotional_impact_reasoning": "Default score due to insufficient information",
+    "shareability": 70,
+    "shareability_reasoning": "Default score due to insufficient information",
+    "relatability": 70,
+    "relatability_reasoning": "Default score due to insufficient information",
+    "uniqueness": 70,
+    "uniqueness_reasoning": "Default score due to insufficient information",
+    "overall_score": 70
+}
+
+_PLATFORM_DEFAULTS: Final[Dict[str, Any]] = {
+    "platform_scores": {
+        "instagram": 70,
+        "tiktok": 70,
+        "youtube_shorts": 70
+    },
+    "recommendations": [
+        "Optimize visual composition for mobile viewing",
+        "Include clear calls-to-action",
+        "Add captions for better accessibility"
+    ],
+    "reasoning": {
+        "instagram": "Default score due to insufficient information",
+        "tiktok": "Default score due to insufficient information",
+        "youtube_shorts": "Default score due to insufficient information"
+    }
+}
+
+_HOOK_DEFAULTS: Final[Dict[str, Any]] = {
+    "attention_grab": 70,
+    "curiosity_gap": 70,
+    "relevance": 70,
+    "memorability": 70,
+    "overall_score": 70,
+    "reasoning": "Default scores due to insufficient information"
+}
+
+_EDITING_DEFAULTS: Final[Dict[str, Any]] = {
+    "pacing": 70,
+    "visual_coherence": 70,
+    "technical_quality": 70,
+    "engagement_impact": 70,
+    "overall_score": 70,
+    "reasoning": "Default scores due to insufficient information"
+}
+
+_VOICE_DEFAULTS: Final[Dict[str, Any]] = {
+    "clarity": 70,
+    "energy_level": 70,
+    "authenticity": 70,
+    "audience_match": 70,
+    "overall_score": 70,
+    "reasoning": "Default scores due to insufficient information"
+}
+
+# Immutable portion of the fallback dashboard; deep-copied per use so callers
+# can mutate the result freely.
+_DEFAULT_DASHBOARD_TEMPLATE: Final[Dict[str, Any]] = {
+    "metadata": {},
+    "summary_metrics": {
+        "attention_score": {
+            "value": "70",
+            "description": "Overall audience attention retention"
+        },
+        "engagement": {
+            "value": "70",
+            "description": "Level of audience interaction expected"
+        },
+        "retention": {
+            "value": "70%",
+            "description": "Percentage of viewers likely to watch to completion"
+        }
+    },
+    "viral_potential": {
+        "overall_score": 70,
+        "criteria": [
+            {"name": "Visuals", "value": 70, "description": "Default visual assessment"},
+            {"name": "Emotional Impact", "value": 70, "description": "Default emotional impact assessment"},
+            {"name": "Shareability", "value": 70, "description": "Default shareability assessment"},
+            {"name": "Relatability", "value": 70, "description": "Default relatability assessment"},
+            {"name": "Uniqueness", "value": 70, "description": "Default uniqueness assessment"}
+        ]
+    },
+    "social_media_insights": {
+        "platform_scores": {
+            "instagram": 70,
+            "tiktok": 70,
+            "youtube_shorts": 70
+        },
+        "best_performing": "instagram",
+        "recommendations": [
+            "Optimize visual composition for mobile viewing",
+            "Include clear calls-to-action",
+            "Add captions for better accessibility"
+        ]
+    },
+    "content_analysis": {
+        "hook_effectiveness": {
+            "text": "No hook analysis available",
+            "metrics": {
+                "attention_grab": 70,
+                "curiosity_gap": 70,
+                "relevance": 70,
+                "memorability": 70,
+                "overall_score": 70
+            }
+        },
+        "editing_quality": {
+            "text": "No editing analysis available",
+            "metrics": {
+                "pacing": 70,
+                "visual_coherence": 70,
+                "technical_quality": 70,
+                "engagement_impact": 70,
+                "overall_score": 70
+            }
+        },
+        "voice_tonality": {
+            "text": "No voice analysis available",
+            "metrics": {
+                "clarity": 70,
+                "energy_level": 70,
+                "authenticity": 70,
+                "audience_match": 70,
+                "overall_score": 70
+            }
+        }
+    }
+}
+
+def _is_scorable(text: Any) -> bool:
+    """Whether a description carries enough content to be worth an LLM call."""
+    if not text:
+        return False
+    if isinstance(text, str):
+        return len(text.strip()) >= _MIN_SCORABLE_TEXT_LEN
+    return True
+
+def _chunk_text(chunk: Any) -> str:
+    """Text of a streamed response chunk, or "" for a chunk without parts
+    (e.g. a trailing finish-reason or safety-blocked chunk)."""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
 class MetricsConverter:
     """Converts natural language analysis into numerical metrics using Gemini."""
     
+    __slots__ = ("model",)
+    
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-        # Configure model parameters for more consistent output
-        self.model.generation_config = {
-            "temperature": 0.4,
-            "top_p": 0.8,
-            "top_k": 40,
-        }
+        # Scoring needs consistency, not creativity: temperature 0 keeps
+        # identical prompts deterministic so cached responses stay valid
+        self.model = genai.GenerativeModel(
+            'gemini-1.5-flash',
+            system_instruction=_SCORING_SYSTEM_INSTRUCTION,
+            generation_config={
+                "temperature": 0,
+                "top_p": 0.8,
+                "top_k": 40,
+            }
+        )
         
     def process_full_analysis(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -32,14 +310,13 @@ class MetricsConverter:
         """
         try:
             # Extract the relevant parts of the analysis
-            if "analysis" in analysis_data:
-                analysis = analysis_data["analysis"]
-            else:
-                analysis = analysis_data  # Sometimes the analysis is directly provided
+            # (sometimes the analysis is directly provided)
+            analysis = analysis_data.get("analysis", analysis_data)
                 
             # Extract performance metrics and detailed analysis
             performance_metrics = analysis.get("Performance Metrics", {})
-            detailed_analysis = analysis.get("Detailed Analysis", {}).get("In-depth Video Analysis", {})
+            da = analysis.get("Detailed Analysis")
+            detailed_analysis = da.get("In-depth Video Analysis", {}) if da else {}
             
             if not detailed_analysis:
                 raise ValueError("Missing required analysis sections")
@@ -104,30 +381,11 @@ class MetricsConverter:
             # Create the criteria list
             criteria = [
                 {
-                    "name": "Visuals",
-                    "value": int(scores.get("Visuals", 70)),
-                    "description": reasoning.get("Visuals", "Visual quality assessment")
-                },
-                {
-                    "name": "Emotional Impact",
-                    "value": int(scores.get("Emotional_Impact", 70)),
-                    "description": reasoning.get("Emotional_Impact", "Emotional impact assessment")
-                },
-                {
-                    "name": "Shareability",
-                    "value": int(scores.get("Shareability", 70)),
-                    "description": reasoning.get("Shareability", "Shareability assessment")
-                },
-                {
-                    "name": "Relatability",
-                    "value": int(scores.get("Relatability", 70)),
-                    "description": reasoning.get("Relatability", "Relatability assessment")
-                },
-                {
-                    "name": "Uniqueness",
-                    "value": int(scores.get("Uniqueness", 70)),
-                    "description": reasoning.get("Uniqueness", "Uniqueness assessment")
+                    "name": name,
+                    "value": int(scores.get(score_key, 70)),
+                    "description": reasoning.get(score_key, description)
                 }
+                for name, score_key, _, _, description in _VIRAL_CRITERIA
             ]
             
             # Calculate the overall score
@@ -141,30 +399,11 @@ class MetricsConverter:
             # Format the criteria list
             criteria = [
                 {
-                    "name": "Visuals",
-                    "value": criteria_data.get("visuals", 70),
-                    "description": criteria_data.get("visuals_reasoning", "Visual quality assessment")
-                },
-                {
-                    "name": "Emotional Impact",
-                    "value": criteria_data.get("emotional_impact", 70),
-                    "description": criteria_data.get("emotional_impact_reasoning", "Emotional impact assessment")
-                },
-                {
-                    "name": "Shareability",
-                    "value": criteria_data.get("shareability", 70),
-                    "description": criteria_data.get("shareability_reasoning", "Shareability assessment")
-                },
-                {
-                    "name": "Relatability",
-                    "value": criteria_data.get("relatability", 70),
-                    "description": criteria_data.get("relatability_reasoning", "Relatability assessment")
-                },
-                {
-                    "name": "Uniqueness",
-                    "value": criteria_data.get("uniqueness", 70),
-                    "description": criteria_data.get("uniqueness_reasoning", "Uniqueness assessment")
+                    "name": name,
+                    "value": criteria_data.get(llm_key, 70),
+                    "description": criteria_data.get(llm_reasoning_key, description)
                 }
+                for name, _, llm_key, llm_reasoning_key, description in _VIRAL_CRITERIA
             ]
             
             # Calculate the overall score
@@ -178,73 +417,26 @@ class MetricsConverter:
     def _score_viral_potential_with_llm(self, detailed_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Use LLM to extract viral potential scores from the analysis."""
         viral_section = detailed_analysis.get("Viral Potential", {})
+        if not viral_section:
+            return copy.deepcopy(_VIRAL_DEFAULTS)
         
         # Prepare the viral potential description for the prompt
         if isinstance(viral_section, dict):
-            viral_description = json.dumps(viral_section, indent=2)
+            viral_description = json.dumps(viral_section, separators=(",", ":"))
         elif isinstance(viral_section, str):
             viral_description = viral_section
         else:
             viral_description = "No specific viral potential information available."
             
         # Create a detailed prompt for the LLM
-        prompt = """
-        Analyze this video's viral potential information and provide numerical scores (0-100) for key viral criteria.
-        
-        Here's the viral potential analysis: {viral_description}
-        
-        For each criterion below:
-        1. Carefully analyze the text
-        2. Consider both explicit mentions of quality/performance and implicit indications
-        3. Apply your knowledge of viral video characteristics
-        4. Assign a score from 0-100 (higher = better)
-        5. Provide brief reasoning for each score
-        
-        Criteria to score:
-        - Visuals: Quality, composition, distinctiveness, color psychology, aesthetic appeal
-        - Emotional Impact: Ability to trigger emotions (joy, surprise, inspiration, etc.)
-        - Shareability: Reasons viewers would share (provides value, social currency, etc.)
-        - Relatability: How well it connects with audience experiences or aspirations
-        - Uniqueness: How differentiated it is from similar content
-        
-        Also calculate an overall score that weighs all factors.
-        
-        Respond in this exact JSON format:
-        {{
-            "visuals": 75,
-            "visuals_reasoning": "brief reasoning",
-            "emotional_impact": 80,
-            "emotional_impact_reasoning": "brief reasoning",
-            "shareability": 85,
-            "shareability_reasoning": "brief reasoning",
-            "relatability": 70,
-            "relatability_reasoning": "brief reasoning",
-            "uniqueness": 65,
-            "uniqueness_reasoning": "brief reasoning",
-            "overall_score": 75,
-            "overall_reasoning": "brief explanation of overall score"
-        }}
-        """.format(viral_description=viral_description)
+        prompt = _VIRAL_POTENTIAL_PROMPT.format_map({"viral_description": viral_description})
         
         # Get the response from the model
-        result = self._get_gemini_response(prompt)
+        result = self._get_gemini_response(prompt, _VIRAL_VALIDATOR)
         
         # If we didn't get valid results, use defaults
         if not result or not isinstance(result, dict):
-            return {
-                "visuals": 70,
-                "visuals_reasoning": "Default score due to insufficient information",
-                "emotional_impact": 70,
-                "emotional_impact_reasoning": "Default score due to insufficient information",
-                "shareability": 70,
-                "shareability_reasoning": "Default score due to insufficient information",
-                "relatability": 70,
-                "relatability_reasoning": "Default score due to insufficient information",
-                "uniqueness": 70,
-                "uniqueness_reasoning": "Default score due to insufficient information",
-                "overall_score": 70,
-                "overall_reasoning": "Default overall score due to insufficient information"
-            }
+            return copy.deepcopy(_VIRAL_DEFAULTS)
             
         return result
     
@@ -259,7 +451,7 @@ class MetricsConverter:
         
         # Determine best performing platform
         platform_scores = platform_data.get("platform_scores", {})
-        best_platform = max(platform_scores, key=platform_scores.get) if platform_scores else "instagram"
+        best_platform = max(platform_scores.items(), key=itemgetter(1))[0] if platform_scores else "instagram"
         
         # Extract improvement suggestions
         improvement_suggestions = performance_metrics.get("Improvement Suggestions", [])
@@ -275,69 +467,19 @@ class MetricsConverter:
         """Use LLM to evaluate platform-specific performance."""
         # Format the platform recommendations for the prompt
         if isinstance(platform_recs, dict):
-            platform_text = json.dumps(platform_recs, indent=2)
+            platform_text = json.dumps(platform_recs, separators=(",", ":"))
         else:
             platform_text = str(platform_recs)
             
         # Create a detailed prompt for the LLM
-        prompt = """
-        Analyze this video's platform recommendations and provide numerical scores (0-100) for performance on different platforms.
-        
-        Here's the platform analysis: {platform_text}
-        
-        Based on the information provided about the video content, evaluate how well it would perform on each platform:
-        - Instagram: Consider visual appeal, mobile optimization, engagement factors
-        - TikTok: Consider trend alignment, hook strength, audio usage, format
-        - YouTube Shorts: Consider branding, retention, discoverability, audience match
-        
-        For each platform:
-        1. Carefully analyze the available information
-        2. Consider platform-specific success factors
-        3. Assign a score from 0-100 (higher = better)
-        4. Provide 1-3 specific actionable recommendations for each platform
-        
-        Respond in this exact JSON format:
-        {{
-            "platform_scores": {{
-                "instagram": 75,
-                "tiktok": 80,
-                "youtube_shorts": 70
-            }},
-            "recommendations": [
-                "recommendation 1",
-                "recommendation 2",
-                "recommendation 3"
-            ],
-            "reasoning": {{
-                "instagram": "brief reasoning",
-                "tiktok": "brief reasoning",
-                "youtube_shorts": "brief reasoning"
-            }}
-        }}
-        """.format(platform_text=platform_text)
+        prompt = _PLATFORM_PROMPT.format_map({"platform_text": platform_text})
         
         # Get the response from the model
-        result = self._get_gemini_response(prompt)
+        result = self._get_gemini_response(prompt, _PLATFORM_VALIDATOR)
         
         # If we didn't get valid results, use defaults
         if not result or not isinstance(result, dict):
-            return {
-                "platform_scores": {
-                    "instagram": 70,
-                    "tiktok": 70,
-                    "youtube_shorts": 70
-                },
-                "recommendations": [
-                    "Optimize visual composition for mobile viewing",
-                    "Include clear calls-to-action",
-                    "Add captions for better accessibility"
-                ],
-                "reasoning": {
-                    "instagram": "Default score due to insufficient information",
-                    "tiktok": "Default score due to insufficient information",
-                    "youtube_shorts": "Default score due to insufficient information"
-                }
-            }
+            return copy.deepcopy(_PLATFORM_DEFAULTS)
             
         return result
         
@@ -370,161 +512,123 @@ class MetricsConverter:
     
     def _score_hook_with_llm(self, hook_text: str) -> Dict[str, Any]:
         """Score hook effectiveness with LLM."""
-        prompt = """
-        Analyze this video hook description and provide numerical scores (0-100) for:
-        1. Attention Grab: How quickly it captures attention
-        2. Curiosity Gap: How well it creates intrigue
-        3. Relevance: How well it connects to target audience
-        4. Memorability: How likely viewers remember it
-        
-        Hook description: "{hook_text}"
-        
-        For each criterion:
-        1. Carefully analyze the hook description
-        2. Consider both explicit quality indicators and implicit effectiveness
-        3. Apply your knowledge of effective video hooks
-        4. Assign a score from 0-100 (higher = better)
-        
-        Respond in this exact JSON format:
-        {{
-            "attention_grab": 85,
-            "curiosity_gap": 75,
-            "relevance": 80,
-            "memorability": 70,
-            "overall_score": 78,
-            "reasoning": "brief explanation"
-        }}
-        """.format(hook_text=hook_text)
-        
-        result = self._get_gemini_response(prompt)
+        if not _is_scorable(hook_text):
+            return copy.deepcopy(_HOOK_DEFAULTS)
+        
+        prompt = _HOOK_PROMPT.format_map({"hook_text": hook_text})
+        
+        result = self._get_gemini_response(prompt, _HOOK_VALIDATOR)
         
         # If we didn't get valid results, use defaults
         if not result or not isinstance(result, dict):
-            return {
-                "attention_grab": 70,
-                "curiosity_gap": 70,
-                "relevance": 70,
-                "memorability": 70,
-                "overall_score": 70,
-                "reasoning": "Default scores due to insufficient information"
-            }
+            return copy.deepcopy(_HOOK_DEFAULTS)
             
         return result
     
     def _score_editing_with_llm(self, editing_text: str) -> Dict[str, Any]:
         """Score editing quality with LLM."""
-        prompt = """
-        Analyze this video editing description and provide numerical scores (0-100) for:
-        1. Pacing: Flow and rhythm of cuts/transitions
-        2. Visual Coherence: How well scenes connect
-        3. Technical Quality: Professional polish level
-        4. Engagement Impact: How editing affects viewer interest
-        
-        Editing description: "{editing_text}"
-        
-        For each criterion:
-        1. Carefully analyze the editing description
-        2. Consider both explicit quality indicators and implicit effectiveness
-        3. Apply your knowledge of professional video editing
-        4. Assign a score from 0-100 (higher = better)
-        
-        Respond in this exact JSON format:
-        {{
-            "pacing": 80,
-            "visual_coherence": 75,
-            "technical_quality": 85,
-            "engagement_impact": 78,
-            "overall_score": 80,
-            "reasoning": "brief explanation"
-        }}
-        """.format(editing_text=editing_text)
-        
-        result = self._get_gemini_response(prompt)
+        if not _is_scorable(editing_text):
+            return copy.deepcopy(_EDITING_DEFAULTS)
+        
+        prompt = _EDITING_PROMPT.format_map({"editing_text": editing_text})
+        
+        result = self._get_gemini_response(prompt, _EDITING_VALIDATOR)
         
         # If we didn't get valid results, use defaults
         if not result or not isinstance(result, dict):
-            return {
-                "pacing": 70,
-                "visual_coherence": 70,
-                "technical_quality": 70,
-                "engagement_impact": 70,
-                "overall_score": 70,
-                "reasoning": "Default scores due to insufficient information"
-            }
+            return copy.deepcopy(_EDITING_DEFAULTS)
             
         return result
     
     def _score_voice_with_llm(self, voice_text: str) -> Dict[str, Any]:
         """Score voice and tonality with LLM."""
-        prompt = """
-        Analyze this voice/tonality description and provide numerical scores (0-100) for:
-        1. Clarity: How clear and understandable
-        2. Energy Level: Enthusiasm and dynamism
-        3. Authenticity: How natural and genuine
-        4. Audience Match: Fit with target demographic
-        
-        Voice description: "{voice_text}"
-        
-        For each criterion:
-        1. Carefully analyze the voice/tonality description
-        2. Consider both explicit quality indicators and implicit effectiveness
-        3. Apply your knowledge of effective voice performance in videos
-        4. Assign a score from 0-100 (higher = better)
-        
-        Respond in this exact JSON format:
-        {{
-            "clarity": 85,
-            "energy_level": 75,
-            "authenticity": 80,
-            "audience_match": 78,
-            "overall_score": 80,
-            "reasoning": "brief explanation"
-        }}
-        """.format(voice_text=voice_text)
-        
-        result = self._get_gemini_response(prompt)
+        if not _is_scorable(voice_text):
+            return copy.deepcopy(_VOICE_DEFAULTS)
+        
+        prompt = _VOICE_PROMPT.format_map({"voice_text": voice_text})
+        
+        result = self._get_gemini_response(prompt, _VOICE_VALIDATOR)
         
         # If we didn't get valid results, use defaults
         if not result or not isinstance(result, dict):
-            return {
-                "clarity": 70,
-                "energy_level": 70,
-                "authenticity": 70,
-                "audience_match": 70,
-                "overall_score": 70,
-                "reasoning": "Default scores due to insufficient information"
-            }
+            return copy.deepcopy(_VOICE_DEFAULTS)
             
         return result
     
-    def _get_gemini_response(self, prompt: str) -> Dict[str, Any]:
-        """Get structured response from Gemini."""
+    def _get_gemini_response(self, prompt: str, validator=None) -> Dict[str, Any]:
+        """Get structured response from Gemini, reusing cached results for
+        identical prompts. Failed, empty or (when a validator is given)
+        schema-invalid responses yield {} and are not cached."""
+        with _response_cache_lock:
+            cached = _response_cache.get(prompt)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        result = self._fetch_gemini_response(prompt)
+        if result and isinstance(result, dict):
+            if validator is not None:
+                try:
+                    _coerce_score_strings(result)
+                    validator(result)
+                except fastjsonschema.JsonSchemaException as e:
+                    print(f"Gemini response failed schema validation: {str(e)}")
+                    return {}
+            with _response_cache_lock:
+                _response_cache[prompt] = copy.deepcopy(result)
+        return result
+    
+    def _fetch_gemini_response(self, prompt: str) -> Dict[str, Any]:
+        """Get structured response from Gemini.
+        
+        The response is streamed and scanned as it arrives, so we stop reading
+        as soon as a complete top-level JSON object has been received.
+        """
+        scanner = JsonObjectScanner()
+        chunks = []
         try:
-            response = self.model.generate_content(prompt)
-            if not response or not response.text:
-                return {}
-            
-            # Try to parse the response as JSON
-            try:
-                return json.loads(response.text)
-            except json.JSONDecodeError:
-                # If JSON parsing fails, try to extract JSON from markdown
-                json_blocks = re.findall(r'```json\s*(.*?)\s*```', response.text, re.DOTALL)
-                if json_blocks:
-                    return json.loads(json_blocks[0])
-                else:
-                    # Try to find a JSON-like structure without code blocks
-                    json_pattern = r'\{[\s\S]*\}'
-                    json_match = re.search(json_pattern, response.text)
-                    if json_match:
-                        return json.loads(json_match.group())
-                    else:
-                        print(f"Failed to parse Gemini response: {response.text}")
-                        return {}
-                    
+            response = self.model.generate_content(prompt, stream=True)
+            scanning = True
+            for chunk in response:
+                chunk_text = _chunk_text(chunk)
+                if not chunk_text:
+                    continue
+                chunks.append(chunk_text)
+                if scanning and scanner.feed(chunk_text) >= 0:
+                    scanning = False
+                    candidate = find_balanced_json("".join(chunks))
+                    try:
+                        return json.loads(candidate)
+                    except json.JSONDecodeError:
+                        pass  # Keep streaming and parse the full text below
         except Exception as e:
+            # Text received before the stream failed may still hold the answer
             print(f"Error getting Gemini response: {str(e)}")
+        
+        text = "".join(chunks)
+        if not text:
             return {}
+        
+        # Try to parse the response as JSON
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+        
+        try:
+            # If JSON parsing fails, try to extract JSON from markdown
+            json_blocks = _JSON_FENCE_RE.findall(text)
+            if json_blocks:
+                return json.loads(json_blocks[0])
+            # Try to find a JSON-like structure without code blocks
+            json_match = _JSON_OBJECT_RE.search(text)
+            if json_match:
+                return json.loads(json_match.group())
+        except json.JSONDecodeError as e:
+            print(f"Error parsing Gemini response: {str(e)}")
+            return {}
+        
+        print(f"Failed to parse Gemini response: {text}")
+        return {}
     
     def _extract_numeric_value(self, value: Any) -> str:
         """Extract numeric value from various formats."""
@@ -533,7 +637,13 @@ class MetricsConverter:
         
         # Extract numbers from strings like "85%" or "90 out of 100"
         if isinstance(value, str):
-            match = re.search(r'(\d+)', value)
+            # Fast path: leading digits, the common "85%" shape
+            i = 0
+            while i < len(value) and value[i].isdigit():
+                i += 1
+            if i:
+                return value[:i]
+            match = _NUM_RE.search(value)
             if match:
                 return match.group(1)
         
@@ -541,79 +651,10 @@ class MetricsConverter:
     
     def _get_default_dashboard_data(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
         """Returns default dashboard data when processing fails."""
-        return {
-            "metadata": {
-                "video_name": analysis_data.get("video_name", "Video Analysis"),
-                "id": analysis_data.get("id", ""),
-                "timestamp": analysis_data.get("timestamp", "")
-            },
-            "summary_metrics": {
-                "attention_score": {
-                    "value": "70",
-                    "description": "Overall audience attention retention"
-                },
-                "engagement": {
-                    "value": "70",
-                    "description": "Level of audience interaction expected"
-                },
-                "retention": {
-                    "value": "70%",
-                    "description": "Percentage of viewers likely to watch to completion"
-                }
-            },
-            "viral_potential": {
-                "overall_score": 70,
-                "criteria": [
-                    {"name": "Visuals", "value": 70, "description": "Default visual assessment"},
-                    {"name": "Emotional Impact", "value": 70, "description": "Default emotional impact assessment"},
-                    {"name": "Shareability", "value": 70, "description": "Default shareability assessment"},
-                    {"name": "Relatability", "value": 70, "description": "Default relatability assessment"},
-                    {"name": "Uniqueness", "value": 70, "description": "Default uniqueness assessment"}
-                ]
-            },
-            "social_media_insights": {
-                "platform_scores": {
-                    "instagram": 70,
-                    "tiktok": 70,
-                    "youtube_shorts": 70
-                },
-                "best_performing": "instagram",
-                "recommendations": [
-                    "Optimize visual composition for mobile viewing",
-                    "Include clear calls-to-action",
-                    "Add captions for better accessibility"
-                ]
-            },
-            "content_analysis": {
-                "hook_effectiveness": {
-                    "text": "No hook analysis available",
-                    "metrics": {
-                        "attention_grab": 70,
-                        "curiosity_gap": 70,
-                        "relevance": 70,
-                        "memorability": 70,
-                        "overall_score": 70
-                    }
-                },
-                "editing_quality": {
-                    "text": "No editing analysis available",
-                    "metrics": {
-                        "pacing": 70,
-                        "visual_coherence": 70,
-                        "technical_quality": 70,
-                        "engagement_impact": 70,
-                        "overall_score": 70
-                    }
-                },
-                "voice_tonality": {
-                    "text": "No voice analysis available",
-                    "metrics": {
-                        "clarity": 70,
-                        "energy_level": 70,
-                        "authenticity": 70,
-                        "audience_match": 70,
-                        "overall_score": 70
-                    }
-                }
-            }
-        } 
+        result = copy.deepcopy(_DEFAULT_DASHBOARD_TEMPLATE)
+        result["metadata"] = {
+            "video_name": analysis_data.get("video_name", "Video Analysis"),
+            "id": analysis_data.get("id", ""),
+            "timestamp": analysis_data.get("timestamp", "")
+        }
+        return result
@@ -1,14 +1,23 @@
 import os
-import json
-from datetime import datetime
+import orjson
+import string
+from datetime import datetime, timezone
 import uuid
 from typing import Dict, List, Optional, Any
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne, DeleteOne, IndexModel, ASCENDING, DESCENDING, WriteConcern
+from pymongo.errors import BulkWriteError
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
-from bson.objectid import ObjectId
-import sys
+from bson.binary import Binary
+from cachetools import TTLCache
+import zstandard
+import asyncio
+import copy
+import logging
+import threading
+import queue
+import time
 import pymongo
-import traceback
 
 # Load environment variables
 load_dotenv()
@@ -18,12 +27,247 @@ MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
 MONGODB_DB = os.getenv("MONGODB_DB", "branded_content_ai")
 MONGODB_ANALYSES_COLLECTION = os.getenv("MONGODB_ANALYSES_COLLECTION", "analyses")
 
+# Per-request messages log at DEBUG, so they cost nothing unless enabled
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv("MONGODB_STORAGE_LOG_LEVEL", "INFO").upper())
+
 # Fallback local storage
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 ANALYSES_DIR = os.path.join(DATA_DIR, "analyses")
+# Analyses that could not be saved to MongoDB wait here to be replayed. It is
+# kept apart from ANALYSES_DIR, which storage.py and analysis_storage.py own.
+FALLBACK_DIR = os.path.join(DATA_DIR, "mongo_fallback")
 
 # Create data directories if they don't exist
 os.makedirs(ANALYSES_DIR, exist_ok=True)
+os.makedirs(FALLBACK_DIR, exist_ok=True)
+
+# Maps every disallowed ASCII character to "_" for generate_id
+_ID_ALLOWED_CHARS = frozenset(string.ascii_letters + string.digits + "-_")
+_ID_TRANSLATION = str.maketrans({chr(i): "_" for i in range(128) if chr(i) not in _ID_ALLOWED_CHARS})
+
+# Unique id index makes upserts idempotent; the compound index backs the
+# newest-first listing query
+_ANALYSES_INDEXES = [
+    IndexModel([("id", ASCENDING)], unique=True),
+    IndexModel([("timestamp", DESCENDING), ("id", ASCENDING)]),
+]
+
+_MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+]
+
+# Summary fields returned by list_analyses; analysis_data is never fetched.
+# The display date is formatted by the server so listing does no per-row
+# datetime parsing in Python. The month name is looked up from $month
+# because $dateToString only gained %B in MongoDB 7.0.
+_LIST_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "content_name": 1,
+    "timestamp": 1,
+    "thumbnail": 1,
+    "formatted_date": {"$ifNull": [
+        {"$let": {
+            "vars": {
+                "date": {"$convert": {"input": "$timestamp", "to": "date", "onError": None, "onNull": None}}
+            },
+            "in": {"$concat": [
+                {"$arrayElemAt": [_MONTH_NAMES, {"$subtract": [{"$month": "$$date"}, 1]}]},
+                " ",
+                {"$dateToString": {"format": "%d, %Y", "date": "$$date"}}
+            ]}
+        }},
+        "$formatted_date"
+    ]}
+}
+
+# After a failed create_indexes, get_collection tries again once this many
+# seconds have passed, so a transient error does not leave the unique id
+# index missing for the life of the process
+_INDEX_RETRY_SECONDS = 30.0
+
+# Short-lived cache of get_analysis results; dashboards re-fetch the same
+# analysis repeatedly. Entries are dropped whenever an analysis is written.
+_read_cache = TTLCache(maxsize=512, ttl=60)
+_read_cache_lock = threading.RLock()
+
+# Interim checkpoint saves only wait for the primary's in-memory ack. A
+# checkpoint can be lost on primary failover, which is acceptable because
+# the analysis is simply rerun; final saves keep the collection's default.
+_CHECKPOINT_WRITE_CONCERN = WriteConcern(w=1, j=False)
+_DURABILITY_LEVELS = ("checkpoint", "final")
+
+def _collection_for_durability(collection, durability: str):
+    """Return collection with the write concern for the durability level."""
+    if durability not in _DURABILITY_LEVELS:
+        raise ValueError(f"durability must be one of {_DURABILITY_LEVELS}, got {durability!r}")
+    if durability == "checkpoint":
+        return collection.with_options(write_concern=_CHECKPOINT_WRITE_CONCERN)
+    return collection
+
+def _invalidate_cached_analyses(*analysis_ids: str) -> None:
+    """Drop cached get_analysis results for the given IDs."""
+    with _read_cache_lock:
+        for analysis_id in analysis_ids:
+            _read_cache.pop(analysis_id, None)
+
+_FALLBACK_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+
+# analysis_data larger than this is stored as a zstd-compressed JSON blob in
+# analysis_data_zstd. schema_version records which layout a document uses so
+# old and new documents can coexist.
+_COMPRESS_THRESHOLD_BYTES = 16384
+_PLAIN_SCHEMA_VERSION = 1
+_COMPRESSED_SCHEMA_VERSION = 2
+
+# Merges into compressed analysis_data are read-modify-write; a write that
+# loses a race with another update is retried this many times in total
+_MERGE_ATTEMPTS = 3
+
+def _pack_analysis(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of fields with a large analysis_data compressed."""
+    packed = dict(fields)
+    packed["schema_version"] = _PLAIN_SCHEMA_VERSION
+    try:
+        payload = orjson.dumps(packed["analysis_data"], option=_FALLBACK_JSON_OPTIONS)
+    except TypeError:
+        # Not JSON-representable; store it as plain BSON
+        return packed
+    if len(payload) > _COMPRESS_THRESHOLD_BYTES:
+        del packed["analysis_data"]
+        packed["analysis_data_zstd"] = Binary(zstandard.compress(payload, level=3))
+        packed["schema_version"] = _COMPRESSED_SCHEMA_VERSION
+    return packed
+
+def _packed_save_update(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Update spec that stores fields and clears the other analysis_data layout."""
+    packed = _pack_analysis(fields)
+    stale = "analysis_data" if "analysis_data_zstd" in packed else "analysis_data_zstd"
+    return {"$set": packed, "$unset": {stale: ""}}
+
+def _unpack_analysis(doc: Dict[str, Any]) -> None:
+    """Restore a compressed analysis_data in place."""
+    blob = doc.pop("analysis_data_zstd", None)
+    if blob is not None:
+        doc["analysis_data"] = orjson.loads(zstandard.decompress(blob))
+    doc.pop("schema_version", None)
+
+def _merge_packed_update(doc: Dict[str, Any], update_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Update spec merging update_data into a document with compressed analysis_data."""
+    _unpack_analysis(doc)
+    fields = {key: value for key, value in update_data.items() if key != "analysis_data"}
+    current = doc.get("analysis_data")
+    if not isinstance(current, dict):
+        current = {}
+    fields["analysis_data"] = {**current, **update_data["analysis_data"]}
+    return _packed_save_update(fields)
+
+# Server error code for a unique index violation
+_DUPLICATE_KEY_ERROR = 11000
+
+def _replay_query(analysis_id: str, timestamp: datetime) -> Dict[str, Any]:
+    """Filter matching a document a fallback copy saved at timestamp may replace.
+    
+    Only documents no newer than the fallback copy match (legacy string
+    timestamps always predate it). When a newer document exists the upsert
+    collides with the unique id index instead of overwriting it.
+    """
+    return {"id": analysis_id, "$or": [
+        {"timestamp": {"$lte": timestamp}},
+        {"timestamp": {"$not": {"$type": "date"}}}
+    ]}
+
+def _utc_isoformat(value: datetime) -> str:
+    """ISO string with an explicit UTC offset for a date read from MongoDB.
+    
+    The driver returns naive datetimes that are implicitly UTC.
+    """
+    return value.replace(tzinfo=timezone.utc).isoformat()
+
+def _write_local_analysis(full_analysis: Dict[str, Any]) -> None:
+    """Write an analysis to the local fallback directory."""
+    filepath = os.path.join(FALLBACK_DIR, f"{full_analysis['id']}.json")
+    with open(filepath, "wb") as f:
+        f.write(orjson.dumps(full_analysis, option=_FALLBACK_JSON_OPTIONS))
+        f.flush()
+        os.fsync(f.fileno())
+
+def _read_local_analysis(analysis_id: str) -> Optional[Dict[str, Any]]:
+    """Read an analysis from the local fallback directory, if present."""
+    filepath = os.path.join(FALLBACK_DIR, f"{analysis_id}.json")
+    try:
+        with open(filepath, "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+# Failed saves are handed to a background writer so the request thread never
+# waits on disk. The writer also replays pending files to MongoDB once it is
+# reachable again.
+_FALLBACK_BATCH_SIZE = 64
+_FALLBACK_POLL_SECONDS = 0.2
+_FALLBACK_REPLAY_SECONDS = 30.0
+
+_fallback_q = queue.Queue(maxsize=1024)
+_fallback_worker = None
+_fallback_worker_lock = threading.Lock()
+
+def _drain_upto(q: queue.Queue, max_items: int, timeout: float) -> List[Dict[str, Any]]:
+    """Block up to timeout for one item, then take whatever else is ready."""
+    try:
+        batch = [q.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    while len(batch) < max_items:
+        try:
+            batch.append(q.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+def _fallback_writer_loop() -> None:
+    """Write queued analyses to disk and periodically replay them to MongoDB."""
+    pending_replay = any(f.endswith(".json") for f in os.listdir(FALLBACK_DIR))
+    last_replay = time.monotonic()
+    
+    while True:
+        for full_analysis in _drain_upto(_fallback_q, _FALLBACK_BATCH_SIZE, _FALLBACK_POLL_SECONDS):
+            try:
+                _write_local_analysis(full_analysis)
+                pending_replay = True
+                logger.info("Analysis saved to local fallback with ID: %s", full_analysis["id"])
+            except Exception as e:
+                logger.error("Error saving to local fallback: %s", e)
+        
+        if pending_replay and time.monotonic() - last_replay >= _FALLBACK_REPLAY_SECONDS:
+            last_replay = time.monotonic()
+            try:
+                MongoDBStorage.replay_local_fallback()
+                pending_replay = False
+            except Exception as e:
+                logger.warning("Error replaying local fallback: %s", e)
+
+def _enqueue_fallback_write(full_analysis: Dict[str, Any]) -> None:
+    """Queue an analysis for the background fallback writer."""
+    global _fallback_worker
+    
+    # is_alive() also catches a worker that did not survive a fork
+    if _fallback_worker is None or not _fallback_worker.is_alive():
+        with _fallback_worker_lock:
+            if _fallback_worker is None or not _fallback_worker.is_alive():
+                _fallback_worker = threading.Thread(
+                    target=_fallback_writer_loop,
+                    name="mongodb-fallback-writer",
+                    daemon=True
+                )
+                _fallback_worker.start()
+    
+    try:
+        _fallback_q.put_nowait(full_analysis)
+    except queue.Full:
+        logger.error("Local fallback queue full, dropping analysis %s", full_analysis["id"])
 
 class MongoDBStorage:
     """
@@ -33,6 +277,10 @@ class MongoDBStorage:
     _client = None
     _db = None
     _collection = None
+    _init_lock = threading.Lock()
+    _pid = None
+    _indexes_ensured = False
+    _index_retry_at = 0.0
     
     @classmethod
     def get_collection(cls, server_selection_timeout_ms=1000, connect_timeout_ms=1000, socket_timeout_ms=1000):
@@ -47,62 +295,124 @@ class MongoDBStorage:
         Returns:
             MongoDB collection
         """
-        # Initialize client if not already initialized
-        if cls._client is None:
-            try:
-                # Detect environment - check if we're running locally or in production (Heroku)
-                is_production = bool(os.environ.get('DYNO'))  # 'DYNO' env var exists in Heroku
-                
-                # Prepare connection options
-                connection_options = {
-                    'serverSelectionTimeoutMS': server_selection_timeout_ms,
-                    'connectTimeoutMS': connect_timeout_ms,
-                    'socketTimeoutMS': socket_timeout_ms,
-                }
+        pid = os.getpid()
+        
+        # Fast path: collection already resolved in this process
+        if cls._pid == pid and cls._collection is not None and not cls._indexes_due():
+            return cls._collection
+            
+        # Serialize first-time setup so concurrent requests don't each open a client
+        with cls._init_lock:
+            # A client inherited across fork (e.g. gunicorn workers) is not
+            # safe to use; drop it and connect afresh in this process
+            if cls._pid != pid:
+                cls._client = None
+                cls._db = None
+                cls._collection = None
+                cls._pid = pid
                 
-                # Add SSL parameters to URI if they're not already present and we're in production
-                uri = MONGODB_URI
+            if cls._collection is not None:
+                cls._ensure_indexes(cls._collection)
+                return cls._collection
                 
-                if is_production:
-                    print(f"Running in production environment (Heroku)")
-                    # In production, we need to handle SSL appropriately
-                    if '?' in uri and 'tlsAllowInvalidCertificates=true' not in uri:
-                        uri += '&tlsAllowInvalidCertificates=true'
-                    elif '?' not in uri:
-                        uri += '?tlsAllowInvalidCertificates=true'
-                    
-                    # Add SSL options only for production
-                    connection_options['ssl'] = True
-                    print(f"Using SSL for MongoDB connection")
-                else:
-                    print(f"Running in local development environment")
+            # Initialize client if not already initialized
+            if cls._client is None:
+                try:
+                    uri, connection_options = cls._connection_settings(
+                        server_selection_timeout_ms, connect_timeout_ms, socket_timeout_ms
+                    )
                 
-                # Connect with appropriate options
-                print(f"Connecting to MongoDB...")
-                cls._client = MongoClient(uri, **connection_options)
+                    # Connect with appropriate options
+                    logger.info("Connecting to MongoDB...")
+                    cls._client = MongoClient(uri, **connection_options)
                 
-                # Test connection
-                try:
-                    info = cls._client.server_info()
-                    print(f"MongoDB connection successful. Server version: {info.get('version', 'unknown')}")
-                except Exception as e:
-                    print(f"Warning: Server info test failed, but continuing: {e}")
-                    # Try a simpler test
-                    cls._client.admin.command('ping')
-                    print("MongoDB ping successful")
+                    # Test connection
+                    try:
+                        info = cls._client.server_info()
+                        logger.info("MongoDB connection successful. Server version: %s", info.get("version", "unknown"))
+                    except Exception as e:
+                        logger.warning("Server info test failed, but continuing: %s", e)
+                        # Try a simpler test
+                        cls._client.admin.command('ping')
+                        logger.info("MongoDB ping successful")
                     
-            except Exception as e:
-                print(f"Error initializing MongoDB client: {e}", file=sys.stderr)
-                traceback.print_exc()
-                raise
+                except Exception as e:
+                    logger.exception("Error initializing MongoDB client: %s", e)
+                    raise
+            
+            # Get database - if database doesn't exist, MongoDB will create it
+            cls._db = cls._client[MONGODB_DB]
+            
+            # Get collection - if collection doesn't exist, MongoDB will create it
+            collection = cls._db[MONGODB_ANALYSES_COLLECTION]
+            
+            cls._ensure_indexes(collection)
+            cls._collection = collection
         
-        # Get database - if database doesn't exist, MongoDB will create it
-        db = cls._client[MONGODB_DB]
+        return cls._collection
+    
+    @classmethod
+    def _indexes_due(cls) -> bool:
+        """Whether the analyses indexes still need to be (re)tried."""
+        return not cls._indexes_ensured and time.monotonic() >= cls._index_retry_at
+    
+    @classmethod
+    def _index_creation_failed(cls, error: Exception) -> None:
+        """Schedule the next index attempt after a failed create_indexes."""
+        cls._index_retry_at = time.monotonic() + _INDEX_RETRY_SECONDS
+        logger.warning("Could not ensure analyses indexes, retrying in %.0fs: %s", _INDEX_RETRY_SECONDS, error)
+    
+    @classmethod
+    def _ensure_indexes(cls, collection) -> None:
+        """Create both indexes in one command; marked done only on success."""
+        if not cls._indexes_due():
+            return
+        try:
+            collection.create_indexes(_ANALYSES_INDEXES)
+            cls._indexes_ensured = True
+        except Exception as e:
+            cls._index_creation_failed(e)
+    
+    @staticmethod
+    def _connection_settings(server_selection_timeout_ms, connect_timeout_ms, socket_timeout_ms):
+        """Build the MongoDB URI and client options for the current environment."""
+        # Detect environment - check if we're running locally or in production (Heroku)
+        is_production = bool(os.environ.get('DYNO'))  # 'DYNO' env var exists in Heroku
         
-        # Get collection - if collection doesn't exist, MongoDB will create it
-        collection = db[MONGODB_ANALYSES_COLLECTION]
+        # Prepare connection options
+        connection_options = {
+            'serverSelectionTimeoutMS': server_selection_timeout_ms,
+            'connectTimeoutMS': connect_timeout_ms,
+            'socketTimeoutMS': socket_timeout_ms,
+            # One pooled client is shared by every request thread
+            'maxPoolSize': 50,
+            'minPoolSize': 5,
+            'maxIdleTimeMS': 60000,
+            'retryWrites': True,
+            # Analysis documents are verbose JSON; compress on the wire.
+            # The driver skips codecs the server or environment lacks.
+            'compressors': 'zstd,snappy,zlib',
+            'zlibCompressionLevel': 6,
+        }
         
-        return collection
+        # Add SSL parameters to URI if they're not already present and we're in production
+        uri = MONGODB_URI
+        
+        if is_production:
+            logger.info("Running in production environment (Heroku)")
+            # In production, we need to handle SSL appropriately
+            if '?' in uri and 'tlsAllowInvalidCertificates=true' not in uri:
+                uri += '&tlsAllowInvalidCertificates=true'
+            elif '?' not in uri:
+                uri += '?tlsAllowInvalidCertificates=true'
+        
+            # Add SSL options only for production
+            connection_options['ssl'] = True
+            logger.info("Using SSL for MongoDB connection")
+        else:
+            logger.info("Running in local development environment")
+        
+        return uri, connection_options
     
     @classmethod
     def close_connection(cls):
@@ -112,17 +422,42 @@ class MongoDBStorage:
             cls._client = None
             cls._db = None
             cls._collection = None
-            print("MongoDB connection closed")
+            logger.info("MongoDB connection closed")
     
     @staticmethod
-    def generate_id(content_name: str) -> str:
+    def generate_id(content_name: str, now: Optional[datetime] = None) -> str:
         """Generate a unique ID for an analysis based on content name and timestamp."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        sanitized_name = ''.join(c if c.isalnum() or c in ['-', '_'] else '_' for c in content_name)
+        timestamp = (now or datetime.now(timezone.utc)).strftime("%Y%m%d_%H%M%S")
+        sanitized_name = content_name.translate(_ID_TRANSLATION)
+        if not sanitized_name.isascii():
+            # Non-ASCII characters need the per-character Unicode check
+            sanitized_name = ''.join(c if c.isalnum() or c in ['-', '_'] else '_' for c in sanitized_name)
         return f"{sanitized_name}_{timestamp}"
     
     @classmethod
-    def save_analysis(cls, analysis_data: Dict[str, Any], content_name: str = None, analysis_id: str = None) -> str:
+    def _build_full_analysis(cls, analysis_data: Dict[str, Any], content_name: str = None, analysis_id: str = None) -> Dict[str, Any]:
+        """Wrap analysis data with its ID, content name and timestamp."""
+        # One clock read serves both the ID and the stored timestamp
+        now = datetime.now(timezone.utc)
+        
+        # Generate ID if not provided
+        if not analysis_id:
+            if not content_name:
+                content_name = f"analysis_{uuid.uuid4().hex[:8]}"
+            analysis_id = cls.generate_id(content_name, now)
+        
+        # The timestamp is stored as a native BSON date so sorting and range
+        # queries compare dates rather than strings
+        return {
+            "id": analysis_id,
+            "content_name": content_name,
+            "timestamp": now,
+            "analysis_data": analysis_data
+        }
+    
+    @classmethod
+    def save_analysis(cls, analysis_data: Dict[str, Any], content_name: str = None, analysis_id: str = None,
+                      durability: str = "final") -> str:
         """
         Save an analysis to MongoDB.
         
@@ -130,46 +465,73 @@ class MongoDBStorage:
             analysis_data: The analysis data to save
             content_name: Name of the content (video filename or URL identifier)
             analysis_id: Optional custom ID. If not provided, one will be generated.
+            durability: "final" uses the default write concern; "checkpoint"
+                acknowledges on the primary only (w=1, no journal), trading
+                failover safety for latency on interim saves
             
         Returns:
             The ID of the saved analysis
         """
-        # Generate ID if not provided
-        if not analysis_id:
-            if not content_name:
-                content_name = f"analysis_{uuid.uuid4().hex[:8]}"
-            analysis_id = cls.generate_id(content_name)
-        
-        # Prepare the full analysis object with metadata
-        full_analysis = {
-            "id": analysis_id,
-            "content_name": content_name,
-            "timestamp": datetime.now().isoformat(),
-            "analysis_data": analysis_data
-        }
+        full_analysis = cls._build_full_analysis(analysis_data, content_name, analysis_id)
+        analysis_id = full_analysis["id"]
         
         # Get collection and save document
-        collection = cls.get_collection()
+        collection = _collection_for_durability(cls.get_collection(), durability)
         
         try:
-            # Check if document already exists with this ID
-            existing = collection.find_one({"id": analysis_id})
-            if existing:
-                # Update existing document
-                collection.update_one(
-                    {"id": analysis_id},
-                    {"$set": full_analysis}
-                )
-            else:
-                # Insert new document
-                collection.insert_one(full_analysis)
+            # Insert or replace fields in a single atomic round-trip
+            collection.update_one(
+                {"id": analysis_id},
+                _packed_save_update(full_analysis),
+                upsert=True
+            )
+            _invalidate_cached_analyses(analysis_id)
                 
-            print(f"Analysis saved to MongoDB with ID: {analysis_id}")
+            logger.debug("Analysis saved to MongoDB with ID: %s", analysis_id)
         except Exception as e:
-            print(f"Error saving to MongoDB: {e}", file=sys.stderr)
+            logger.error("Error saving to MongoDB: %s", e)
+            _enqueue_fallback_write(full_analysis)
             
         return analysis_id
     
+    @classmethod
+    def bulk_save_analyses(cls, analyses: List[Dict[str, Any]]) -> int:
+        """
+        Save many analyses in a single bulk write.
+        
+        Args:
+            analyses: Full analysis documents, each with at least an "id" key
+            
+        Returns:
+            The number of documents inserted or modified
+        """
+        ops = [UpdateOne({"id": a["id"]}, _packed_save_update(a), upsert=True) for a in analyses]
+        if not ops:
+            return 0
+            
+        collection = cls.get_collection()
+        
+        try:
+            result = collection.bulk_write(ops, ordered=False)
+            _invalidate_cached_analyses(*(a["id"] for a in analyses))
+            logger.debug("Bulk saved %d analyses to MongoDB", len(ops))
+            return result.upserted_count + result.modified_count
+        except Exception as e:
+            logger.error("Error bulk saving to MongoDB: %s", e)
+            return 0
+    
+    @staticmethod
+    def _normalize_analysis(result: Dict[str, Any]) -> None:
+        """Make a fetched document JSON-friendly in place."""
+        _unpack_analysis(result)
+        # _id is always an ObjectId in this collection; str() is a no-op on
+        # the rare string _id, so no type check is needed
+        if "_id" in result:
+            result["_id"] = str(result["_id"])
+        # Older documents store ISO strings; keep callers on that format
+        if isinstance(result.get("timestamp"), datetime):
+            result["timestamp"] = _utc_isoformat(result["timestamp"])
+    
     @classmethod
     def get_analysis(cls, analysis_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -184,6 +546,11 @@ class MongoDBStorage:
         if not analysis_id:
             return None
             
+        with _read_cache_lock:
+            cached = _read_cache.get(analysis_id)
+        if cached is not None:
+            return copy.deepcopy(cached)
+            
         collection = cls.get_collection()
         
         try:
@@ -191,88 +558,120 @@ class MongoDBStorage:
             result = collection.find_one({"id": analysis_id})
             
             if result:
-                # Convert ObjectId to string for JSON serialization
-                if "_id" in result and isinstance(result["_id"], ObjectId):
-                    result["_id"] = str(result["_id"])
+                cls._normalize_analysis(result)
+                with _read_cache_lock:
+                    _read_cache[analysis_id] = copy.deepcopy(result)
                 return result
         except Exception as e:
-            print(f"Error retrieving analysis {analysis_id}: {e}", file=sys.stderr)
+            logger.error("Error retrieving analysis %s: %s", analysis_id, e)
+            try:
+                return _read_local_analysis(analysis_id)
+            except Exception as fallback_error:
+                logger.error("Error reading local fallback for %s: %s", analysis_id, fallback_error)
             
         return None
     
+    @staticmethod
+    def _list_query(before: Optional[str], before_id: Optional[str] = None) -> Dict[str, Any]:
+        """Filter for analyses after the pagination cursor in list order, if any."""
+        if not before:
+            return {}
+        # Newer documents store BSON dates, older ones ISO strings;
+        # match whichever representation is older than the cursor
+        cursors = [before]
+        try:
+            cursors.insert(0, datetime.fromisoformat(before))
+        except ValueError:
+            pass
+        
+        clauses = []
+        for timestamp in cursors:
+            clauses.append({"timestamp": {"$lt": timestamp}})
+            # Same-timestamp analyses are ordered by id; resume after the last one
+            if before_id:
+                clauses.append({"timestamp": timestamp, "id": {"$gt": before_id}})
+        return {"$or": clauses} if len(clauses) > 1 else clauses[0]
+    
     @classmethod
-    def list_analyses(cls, limit: int = 20, skip: int = 0) -> List[Dict[str, Any]]:
+    def _list_pipeline(cls, limit: int, skip: int, before: Optional[str],
+                       before_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Aggregation pipeline backing list_analyses."""
+        pipeline = []
+        match = cls._list_query(before, before_id)
+        if match:
+            pipeline.append({"$match": match})
+        pipeline.extend([
+            {"$sort": {"timestamp": -1, "id": 1}},
+            {"$skip": skip}
+        ])
+        # As with find().limit(), zero or less means no limit; the $limit
+        # stage itself only accepts positive values
+        if limit > 0:
+            pipeline.append({"$limit": limit})
+        pipeline.append({"$project": _LIST_PROJECTION})
+        return pipeline
+    
+    @staticmethod
+    def _summarize_listed(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a projected document into the list_analyses entry format."""
+        timestamp = doc.get("timestamp")
+        formatted_date = doc.get("formatted_date")
+        if isinstance(timestamp, datetime):
+            timestamp = _utc_isoformat(timestamp)
+        elif timestamp and not formatted_date:
+            # Legacy ISO strings the server could not convert
+            try:
+                formatted_date = datetime.fromisoformat(timestamp).strftime("%B %d, %Y")
+            except (ValueError, TypeError):
+                formatted_date = None
+        
+        return {
+            "id": doc.get("id"),
+            "content_name": doc.get("content_name", "Unknown"),
+            "timestamp": timestamp,
+            "thumbnail": doc.get("thumbnail"),
+            "formatted_date": formatted_date
+        }
+    
+    @classmethod
+    def list_analyses(cls, limit: int = 20, skip: int = 0, before: Optional[str] = None,
+                      before_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         List available analyses with pagination.
         
         Args:
             limit: Maximum number of analyses to return
             skip: Number of analyses to skip
+            before: Optional timestamp of the last analysis already seen. When
+                given, only older analyses are returned, which avoids the O(N)
+                cost of large skips for deep pagination.
+            before_id: Optional ID of that last analysis. Pass it with before
+                so analyses sharing its timestamp are not skipped.
             
         Returns:
             List of analysis metadata
         """
         try:
-            # Set MongoDB client options with timeouts
-            if cls._client is None:
-                # Configure the client with timeouts to prevent hanging
-                print(f"Connecting to MongoDB with timeouts: {MONGODB_URI}")
-                cls._client = MongoClient(
-                    MONGODB_URI,
-                    serverSelectionTimeoutMS=1000,  # 1 second timeout
-                    connectTimeoutMS=1000,
-                    socketTimeoutMS=1000
-                )
-                
             # Use the existing get_collection method which has proper error handling
             collection = cls.get_collection()
             
-            # Get total count for debugging
-            total_count = collection.count_documents({})
-            print(f"Total analyses in collection: {total_count}")
+            # Query for all analyses, sorted by timestamp (newest first), fetching
+            # only the summary fields rather than the full analysis_data payload
+            cursor = collection.aggregate(cls._list_pipeline(limit, skip, before, before_id))
             
-            # If we have documents, fetch them with pagination
-            analyses = []
-            if total_count > 0:
-                # Query for all analyses, sorted by timestamp (newest first)
-                cursor = collection.find({}).sort("timestamp", -1).skip(skip).limit(limit)
-                
-                for doc in cursor:
-                    # Convert ObjectId to string for JSON serialization
-                    if "_id" in doc and isinstance(doc["_id"], ObjectId):
-                        doc["_id"] = str(doc["_id"])
-                        
-                    # Format timestamp for display if needed
-                    timestamp = doc.get("timestamp")
-                    formatted_date = None
-                    if timestamp:
-                        try:
-                            dt = datetime.fromisoformat(timestamp)
-                            formatted_date = dt.strftime("%B %d, %Y")
-                        except (ValueError, TypeError):
-                            formatted_date = None
-                    
-                    # Add analysis to result list with key fields
-                    analyses.append({
-                        "id": doc.get("id"),
-                        "content_name": doc.get("content_name", "Unknown"),
-                        "timestamp": timestamp,
-                        "thumbnail": doc.get("thumbnail"),
-                        "formatted_date": formatted_date or doc.get("formatted_date")
-                    })
-            
-            print(f"Listed {len(analyses)} analyses")
+            analyses = [cls._summarize_listed(doc) for doc in cursor]
+            
+            logger.debug("Listed %d analyses", len(analyses))
             return analyses
             
         except pymongo.errors.ServerSelectionTimeoutError:
-            print("MongoDB server selection timeout. The database may be unreachable.")
+            logger.warning("MongoDB server selection timeout. The database may be unreachable.")
             return []
         except pymongo.errors.ConnectionFailure:
-            print("Failed to connect to MongoDB. The database may be unreachable.")
+            logger.warning("Failed to connect to MongoDB. The database may be unreachable.")
             return []
         except Exception as e:
-            print(f"Error listing analyses: {e}", file=sys.stderr)
-            traceback.print_exc()
+            logger.exception("Error listing analyses: %s", e)
             return []
     
     @classmethod
@@ -290,10 +689,152 @@ class MongoDBStorage:
         
         # Delete document by ID
         result = collection.delete_one({"id": analysis_id})
+        _invalidate_cached_analyses(analysis_id)
         
         # Return True if document was deleted
         return result.deleted_count > 0
     
+    @classmethod
+    def bulk_delete_analyses(cls, analysis_ids: List[str]) -> int:
+        """
+        Delete many analyses in a single bulk write.
+        
+        Args:
+            analysis_ids: The IDs of the analyses to delete
+            
+        Returns:
+            The number of documents deleted
+        """
+        ops = [DeleteOne({"id": analysis_id}) for analysis_id in analysis_ids]
+        if not ops:
+            return 0
+            
+        collection = cls.get_collection()
+        
+        try:
+            result = collection.bulk_write(ops, ordered=False)
+            _invalidate_cached_analyses(*analysis_ids)
+            return result.deleted_count
+        except Exception as e:
+            logger.error("Error bulk deleting from MongoDB: %s", e)
+            return 0
+    
+    @classmethod
+    def replay_local_fallback(cls) -> int:
+        """
+        Push analyses saved to the local fallback directory back to MongoDB.
+        
+        Only files whose writes succeeded are removed; files that cannot be
+        read are skipped and left in place. A fallback copy never replaces a
+        newer document with the same ID; it is dropped instead.
+        
+        Returns:
+            The number of analyses replayed
+        """
+        filenames = [f for f in os.listdir(FALLBACK_DIR) if f.endswith(".json")]
+        if not filenames:
+            return 0
+        
+        # A file that cannot be read or packed is skipped (and kept) so it
+        # does not block the rest of the replay
+        ops = []
+        replayed = []
+        for filename in filenames:
+            try:
+                with open(os.path.join(FALLBACK_DIR, filename), "rb") as f:
+                    analysis = orjson.loads(f.read())
+                # Restore the BSON date that orjson wrote out as an ISO string
+                if isinstance(analysis.get("timestamp"), str):
+                    analysis["timestamp"] = datetime.fromisoformat(analysis["timestamp"])
+                ops.append(UpdateOne(
+                    _replay_query(analysis["id"], analysis["timestamp"]),
+                    _packed_save_update(analysis),
+                    upsert=True
+                ))
+            except Exception as e:
+                logger.warning("Skipping unreadable local fallback file %s: %s", filename, e)
+                continue
+            replayed.append((filename, analysis["id"]))
+        
+        if not ops:
+            return 0
+        
+        superseded = []
+        try:
+            cls.get_collection().bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            # Keep every file whose write failed, or all of them when the
+            # write concern could not be confirmed; upserts are safe to repeat
+            if e.details.get("writeConcernErrors"):
+                failed = set(range(len(ops)))
+            else:
+                failed = set()
+                for error in e.details.get("writeErrors", []):
+                    # A duplicate id means a newer document already exists;
+                    # the stale fallback copy is dropped without being written
+                    if error.get("code") == _DUPLICATE_KEY_ERROR:
+                        superseded.append(replayed[error["index"]])
+                    else:
+                        failed.add(error["index"])
+            if failed:
+                logger.error("Replaying %d of %d local fallback analyses failed: %s", len(failed), len(ops), e)
+            replayed = [entry for index, entry in enumerate(replayed)
+                        if index not in failed and entry not in superseded]
+        
+        _invalidate_cached_analyses(*(analysis_id for _, analysis_id in replayed))
+        for filename, _ in replayed + superseded:
+            os.remove(os.path.join(FALLBACK_DIR, filename))
+        if superseded:
+            logger.info("Dropped %d local fallback analyses superseded by newer MongoDB documents", len(superseded))
+        if replayed:
+            logger.info("Replayed %d analyses from local fallback to MongoDB", len(replayed))
+        return len(replayed)
+    
+    @staticmethod
+    def _merges_analysis_data(update_data: Dict[str, Any]) -> bool:
+        """Whether update_data carries an analysis_data dict to merge."""
+        return isinstance(update_data.get("analysis_data"), dict)
+    
+    @classmethod
+    def _build_update_pipeline(cls, update_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Translate an update payload into a pipeline-style update."""
+        pipeline = []
+        
+        # Merge analysis_data on the server in the same round-trip. Values are
+        # wrapped in $literal so strings starting with "$" are not read as
+        # field paths.
+        if cls._merges_analysis_data(update_data):
+            pipeline.append({"$set": {"analysis_data": {
+                "$mergeObjects": ["$analysis_data", {"$literal": update_data["analysis_data"]}]
+            }}})
+            
+        elif "analysis_data" in update_data:
+            # Anything other than a dict replaces analysis_data outright, in
+            # whichever layout it packs to, and clears the other layout
+            packed = _pack_analysis({"analysis_data": update_data["analysis_data"]})
+            stale = "analysis_data" if "analysis_data_zstd" in packed else "analysis_data_zstd"
+            pipeline.append({"$set": {key: {"$literal": value} for key, value in packed.items()}})
+            pipeline.append({"$unset": stale})
+            
+        # Update other fields
+        other_fields = {
+            key: {"$literal": value}
+            for key, value in update_data.items()
+            if key != "analysis_data"
+        }
+        if other_fields:
+            pipeline.append({"$set": other_fields})
+        
+        return pipeline
+    
+    @classmethod
+    def _update_query(cls, analysis_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Filter for update_analysis, skipping compressed documents for merges."""
+        query = {"id": analysis_id}
+        if cls._merges_analysis_data(update_data):
+            query["analysis_data_zstd"] = {"$exists": False}
+        return query
+    
     @classmethod
     def update_analysis(cls, analysis_id: str, update_data: Dict[str, Any]) -> bool:
         """
@@ -308,47 +849,243 @@ class MongoDBStorage:
         """
         collection = cls.get_collection()
         
-        # Get existing document
-        existing = collection.find_one({"id": analysis_id})
-        if not existing:
-            return False
-            
-        # Prepare update data
-        update_fields = {}
-        
-        # Update analysis_data if provided
-        if "analysis_data" in update_data and isinstance(update_data["analysis_data"], dict):
-            if "analysis_data" not in existing:
-                existing["analysis_data"] = {}
+        pipeline = cls._build_update_pipeline(update_data)
                 
-            # Merge analysis_data
-            update_fields["analysis_data"] = {**existing["analysis_data"], **update_data["analysis_data"]}
-            
-        # Update other fields
-        for key, value in update_data.items():
-            if key != "analysis_data":
-                update_fields[key] = value
+        # Update document; matched_count tells us whether it exists
+        if pipeline:
+            query = cls._update_query(analysis_id, update_data)
+            for _ in range(_MERGE_ATTEMPTS):
+                result = collection.update_one(query, pipeline, upsert=False)
+                if result.matched_count or "analysis_data_zstd" not in query:
+                    break
                 
-        # Update document
-        if update_fields:
-            result = collection.update_one(
-                {"id": analysis_id},
-                {"$set": update_fields}
-            )
-            return result.modified_count > 0
+                # Compressed analysis_data cannot be merged on the server.
+                # Merge it here and write only if the blob is still the one
+                # read, so a concurrent update is never overwritten.
+                doc = collection.find_one({"id": analysis_id})
+                if doc is None:
+                    break
+                if "analysis_data_zstd" not in doc:
+                    continue  # Rewritten uncompressed meanwhile
+                blob = doc["analysis_data_zstd"]
+                result = collection.update_one(
+                    {"id": analysis_id, "analysis_data_zstd": blob},
+                    _merge_packed_update(doc, update_data)
+                )
+                if result.matched_count:
+                    break
+            
+            _invalidate_cached_analyses(analysis_id)
+            return result.matched_count > 0
             
         return False
         
     @classmethod
-    def count_analyses(cls) -> int:
+    def count_analyses(cls, exact: bool = False) -> int:
         """
         Count the total number of analyses in the database.
         
+        Args:
+            exact: Scan the collection for an exact count instead of reading
+                the O(1) collection metadata estimate
+        
         Returns:
             The total count of analyses
         """
         collection = cls.get_collection()
-        return collection.count_documents({})
+        if exact:
+            return collection.count_documents({})
+        return collection.estimated_document_count()
+
+class AsyncMongoDBStorage:
+    """
+    Non-blocking counterpart of MongoDBStorage for asyncio callers, built on
+    motor. Shares connection settings, index state and the read cache with
+    the synchronous class.
+    """
+    
+    # Motor clients are bound to the event loop they were first used on, so
+    # each running loop gets its own client (e.g. successive asyncio.run calls)
+    _clients: Dict[asyncio.AbstractEventLoop, AsyncIOMotorClient] = {}
+    _collections: Dict[asyncio.AbstractEventLoop, Any] = {}
+    _pid = None
+    
+    @classmethod
+    async def get_collection(cls, server_selection_timeout_ms=1000, connect_timeout_ms=1000, socket_timeout_ms=1000):
+        """
+        Get the motor collection for analyses on the running event loop.
+        
+        Args:
+            server_selection_timeout_ms: Timeout for server selection in milliseconds
+            connect_timeout_ms: Timeout for connection establishment in milliseconds
+            socket_timeout_ms: Timeout for socket operations in milliseconds
+            
+        Returns:
+            Motor collection
+        """
+        pid = os.getpid()
+        loop = asyncio.get_running_loop()
+        if cls._pid == pid:
+            collection = cls._collections.get(loop)
+            if collection is not None and not MongoDBStorage._indexes_due():
+                return collection
+        else:
+            # Never reuse clients inherited across fork
+            cls._clients = {}
+            cls._collections = {}
+            cls._pid = pid
+        
+        cls._close_finished_loops()
+            
+        # No await happens between the check and the assignment, so a single
+        # event loop cannot create two clients
+        client = cls._clients.get(loop)
+        if client is None:
+            uri, connection_options = MongoDBStorage._connection_settings(
+                server_selection_timeout_ms, connect_timeout_ms, socket_timeout_ms
+            )
+            client = cls._clients[loop] = AsyncIOMotorClient(uri, **connection_options)
+            
+        collection = client[MONGODB_DB][MONGODB_ANALYSES_COLLECTION]
+        
+        if MongoDBStorage._indexes_due():
+            try:
+                await collection.create_indexes(_ANALYSES_INDEXES)
+                MongoDBStorage._indexes_ensured = True
+            except Exception as e:
+                MongoDBStorage._index_creation_failed(e)
+        
+        cls._collections[loop] = collection
+        return collection
+    
+    @classmethod
+    def _close_finished_loops(cls):
+        """Close and forget the clients of event loops that have been closed."""
+        for loop in [loop for loop in cls._clients if loop.is_closed()]:
+            client = cls._clients.pop(loop)
+            cls._collections.pop(loop, None)
+            try:
+                client.close()
+            except Exception as e:
+                logger.debug("Error closing motor client of a finished loop: %s", e)
+    
+    @classmethod
+    def close_connection(cls):
+        """Close every motor client."""
+        for client in cls._clients.values():
+            client.close()
+        cls._clients = {}
+        cls._collections = {}
+    
+    @classmethod
+    async def save_analysis(cls, analysis_data: Dict[str, Any], content_name: str = None, analysis_id: str = None,
+                            durability: str = "final") -> str:
+        """Async version of MongoDBStorage.save_analysis."""
+        full_analysis = MongoDBStorage._build_full_analysis(analysis_data, content_name, analysis_id)
+        analysis_id = full_analysis["id"]
+        
+        collection = _collection_for_durability(await cls.get_collection(), durability)
+        
+        try:
+            await collection.update_one(
+                {"id": analysis_id},
+                _packed_save_update(full_analysis),
+                upsert=True
+            )
+            _invalidate_cached_analyses(analysis_id)
+            logger.debug("Analysis saved to MongoDB with ID: %s", analysis_id)
+        except Exception as e:
+            logger.error("Error saving to MongoDB: %s", e)
+            _enqueue_fallback_write(full_analysis)
+            
+        return analysis_id
+    
+    @classmethod
+    async def get_analysis(cls, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Async version of MongoDBStorage.get_analysis."""
+        if not analysis_id:
+            return None
+            
+        with _read_cache_lock:
+            cached = _read_cache.get(analysis_id)
+        if cached is not None:
+            return copy.deepcopy(cached)
+            
+        collection = await cls.get_collection()
+        
+        try:
+            result = await collection.find_one({"id": analysis_id})
+            if result:
+                MongoDBStorage._normalize_analysis(result)
+                with _read_cache_lock:
+                    _read_cache[analysis_id] = copy.deepcopy(result)
+                return result
+        except Exception as e:
+            logger.error("Error retrieving analysis %s: %s", analysis_id, e)
+            
+        return None
+    
+    @classmethod
+    async def list_analyses(cls, limit: int = 20, skip: int = 0, before: Optional[str] = None,
+                            before_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Async version of MongoDBStorage.list_analyses."""
+        try:
+            collection = await cls.get_collection()
+            cursor = collection.aggregate(MongoDBStorage._list_pipeline(limit, skip, before, before_id))
+            
+            # Materialize the page in one await rather than per document
+            docs = await cursor.to_list(length=limit if limit > 0 else None)
+            return [MongoDBStorage._summarize_listed(doc) for doc in docs]
+            
+        except Exception as e:
+            logger.error("Error listing analyses: %s", e)
+            return []
+    
+    @classmethod
+    async def delete_analysis(cls, analysis_id: str) -> bool:
+        """Async version of MongoDBStorage.delete_analysis."""
+        collection = await cls.get_collection()
+        result = await collection.delete_one({"id": analysis_id})
+        _invalidate_cached_analyses(analysis_id)
+        return result.deleted_count > 0
+    
+    @classmethod
+    async def update_analysis(cls, analysis_id: str, update_data: Dict[str, Any]) -> bool:
+        """Async version of MongoDBStorage.update_analysis."""
+        pipeline = MongoDBStorage._build_update_pipeline(update_data)
+        if not pipeline:
+            return False
+            
+        collection = await cls.get_collection()
+        query = MongoDBStorage._update_query(analysis_id, update_data)
+        for _ in range(_MERGE_ATTEMPTS):
+            result = await collection.update_one(query, pipeline, upsert=False)
+            if result.matched_count or "analysis_data_zstd" not in query:
+                break
+            
+            doc = await collection.find_one({"id": analysis_id})
+            if doc is None:
+                break
+            if "analysis_data_zstd" not in doc:
+                continue
+            blob = doc["analysis_data_zstd"]
+            result = await collection.update_one(
+                {"id": analysis_id, "analysis_data_zstd": blob},
+                _merge_packed_update(doc, update_data)
+            )
+            if result.matched_count:
+                break
+        
+        _invalidate_cached_analyses(analysis_id)
+        return result.matched_count > 0
+    
+    @classmethod
+    async def count_analyses(cls, exact: bool = False) -> int:
+        """Async version of MongoDBStorage.count_analyses."""
+        collection = await cls.get_collection()
+        if exact:
+            return await collection.count_documents({})
+        return await collection.estimated_document_count()
 
 # For direct testing
 if __name__ == "__main__":
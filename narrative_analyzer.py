@@ -1,13 +1,30 @@
 import os
+import sys
 import time
 import json
 import re
-from typing import List, Dict, Any, Union
+import orjson
+from json_repair import repair_json
+from typing import List, Dict, Any, Optional, Tuple, Union
 from google import genai
 from google.genai import types
 from pathlib import Path
 from dotenv import load_dotenv
-import random
+from json_scanner import JsonObjectScanner, find_balanced_json
+from diskcache import Cache
+from tenacity import AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+import asyncio
+import functools
+import hashlib
+import httpx
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from blake3 import blake3 as _content_hasher
+except ImportError:
+    # blake3 hashes large videos several times faster; sha256 is the fallback
+    _content_hasher = hashlib.sha256
 
 # Load environment variables from .env file
 load_dotenv()
@@ -17,47 +34,229 @@ GEMINI_API_KEY = os.getenv("GOOGLE_GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("GOOGLE_GEMINI_API_KEY not found in environment variables")
 
-# Initialize Gemini client exactly like in test.py
+# Set GEMINI_DEBUG_DUMP to keep a raw_gemini_*_response_*.txt copy of every
+# Gemini response in the working directory
+GEMINI_DEBUG_DUMP = bool(os.getenv("GEMINI_DEBUG_DUMP"))
+
+# Progress and diagnostics go through logging; the CLI below still prints
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv("NARRATIVE_ANALYZER_LOG_LEVEL", "INFO").upper())
+
+# Connection pool settings for the Gemini client's HTTP transports. httpx
+# drops idle connections after 5 s by default, which is shorter than the gaps
+# between polls and retries, so keep them alive long enough to be reused.
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60)
+
+# Initialize Gemini client exactly like in test.py; the module-level client
+# (and its sync and async connection pools) is shared by every call below.
+# The async side gets an explicit httpx transport: without one the SDK uses
+# aiohttp whenever it is installed, ignoring these settings.
 client = genai.Client(
     api_key=GEMINI_API_KEY,
+    http_options=types.HttpOptions(
+        client_args={"http2": True, "limits": _HTTP_LIMITS},
+        async_client_args={"transport": httpx.AsyncHTTPTransport(http2=True, limits=_HTTP_LIMITS)},
+    ),
+)
+
+_VIDEO_MIME_TYPES = {
+    '.mp4': 'video/mp4',
+    '.webm': 'video/webm',
+    '.mov': 'video/quicktime',
+    '.avi': 'video/x-msvideo',
+    '.mkv': 'video/x-matroska'
+}
+
+# Regex patterns compiled once at import rather than looked up in re's cache
+# on every call
+_RE_DEMOGRAPHIC_PAIR = re.compile(r'\"?([\w\s\-\+]+)\"?\s*:\s*\"?(\d+(?:\.\d+)?)\"?')
+_RE_TONALITY_EMOTION_MENTION = re.compile(r"(\d+%\s*[a-zA-Z]+|\b[a-zA-Z]+\s*\d+%)")
+_RE_TONALITY_EMOTION_PAIR = re.compile(r"([\w\s]+):\s*(\d+)%")
+
+# Fields extract_json_from_response warns about when missing, split into
+# key paths once
+_REQUIRED_PATHS = tuple((field, tuple(field.split('.'))) for field in (
+    "Performance Metrics.Attention Score",
+    "Performance Metrics.Engagement Potential",
+    "Performance Metrics.Watch Time Retention",
+    "Performance Metrics.Key Strengths",
+    "Performance Metrics.Improvement Suggestions",
+    "Detailed Analysis.In-depth Video Analysis.Hook",
+    "Detailed Analysis.In-depth Video Analysis.Editing",
+    "Detailed Analysis.In-depth Video Analysis.Tonality",
+    "Demographic Analysis.Gender Distribution",
+    "Demographic Analysis.Age Distribution",
+    "Demographic Analysis.Ethnicity Distribution",
+    "Demographic Analysis.Representation Quality",
+))
+
+def _group_required_paths(paths):
+    """Group required fields by parent path, keeping their order."""
+    groups = {}
+    for field, path in paths:
+        groups.setdefault(path[:-1], []).append((path[-1], field))
+    return tuple((parent, tuple(leaves)) for parent, leaves in groups.items())
+
+# Each parent object is looked up once, then its required leaves
+_REQUIRED_FIELD_GROUPS = _group_required_paths(_REQUIRED_PATHS)
+
+# extract_structured_data finds every field in a single scan. The scan is a
+# lookahead, so overlapping fields are all seen, as with separate searches.
+# Value groups: 2 quoted string, 3 bare number, 4 list body, 5 object body.
+_STRUCTURED_FIELDS = (
+    "Attention Score", "Engagement Potential", "Watch Time Retention",
+    "Key Strengths", "Improvement Suggestions",
+    "Gender Distribution", "Age Distribution", "Ethnicity Distribution",
+    "Representation Quality", "Hook", "Editing", "Tonality",
+    "Visuals", "Content", "Pacing", "Value", "CTA", "Overall",
+    "Emotional_Impact", "Shareability", "Relatability", "Uniqueness",
+    "Instagram", "TikTok", "YouTube Shorts",
+)
+_RE_STRUCTURED_FIELD = re.compile(
+    r'(?=(' + '|'.join(re.escape(field) for field in _STRUCTURED_FIELDS) + r')\"?\s*:\s*'
+    r'(?:\"([^\"]+)|(\d+)|\[(.*?)\]|\{(.*?)\}))'
 )
+_RE_LEADING_DIGITS = re.compile(r'\d+')
+_RE_STRUCTURED_TONALITY_MENTION = re.compile(r"Tonality\"?\s*:.*?(\d+%\s*[a-zA-Z]+|\b[a-zA-Z]+\s*\d+%)")
+_RE_STRUCTURED_TONALITY_PAIR = re.compile(r"Tonality\"?\s*:.*?([\w\s]+):\s*(\d+)%")
+
+def _fast_loads(text):
+    """Parse JSON with orjson, falling back to the lenient stdlib parser."""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # orjson rejects control characters inside strings; strict=False allows them
+        return json.loads(text, strict=False)
+
+def _find_json_fences(text):
+    """Return the stripped bodies of ```json fenced blocks in text.
+    
+    Uses plain substring search rather than a DOTALL regex scan.
+    """
+    blocks = []
+    pos = text.find("```json")
+    while pos >= 0:
+        body_start = pos + len("```json")
+        body_end = text.find("```", body_start)
+        if body_end < 0:
+            break
+        blocks.append(text[body_start:body_end].strip())
+        pos = text.find("```json", body_end + 3)
+    return blocks
+
+def _strip_json_fences(text):
+    """Return text with its ```json fenced blocks cut out.
+    
+    Splices the pieces between fences together in a single pass.
+    """
+    pieces = []
+    last = 0
+    pos = text.find("```json")
+    while pos >= 0:
+        body_end = text.find("```", pos + len("```json"))
+        if body_end < 0:
+            break
+        pieces.append(text[last:pos])
+        last = body_end + 3
+        pos = text.find("```json", last)
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+def _parse_json_object(text, lenient=False):
+    """Return text parsed as a JSON object, or None if it is not one.
+    
+    Requests use response_mime_type="application/json", so the response is
+    normally a bare object and needs none of the regex cleanup. With lenient,
+    raw control characters inside strings (e.g. newlines) are also accepted.
+    """
+    text = text.strip()
+    try:
+        parsed = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        if not lenient:
+            return None
+        try:
+            parsed = json.loads(text, strict=False)
+        except json.JSONDecodeError:
+            return None
+    return parsed if isinstance(parsed, dict) else None
+
+def _save_raw_response(raw_filename, label, raw_content, error_msg=""):
+    """Write a raw Gemini response to disk on a background thread.
+    
+    Only runs when GEMINI_DEBUG_DUMP is set; otherwise responses stay in memory.
+    """
+    if not GEMINI_DEBUG_DUMP:
+        return
+    
+    logger.debug("Saving raw %s response to: %s", label, raw_filename)
+    
+    def _write():
+        # One unbuffered write of the whole dump, no file object in between
+        data = memoryview(
+            f"=== Raw Gemini {label} Response ===\n\n{raw_content}{error_msg}\n\n=== End of {label} Response ===".encode("utf-8")
+        )
+        fd = os.open(raw_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
+    threading.Thread(target=_write, daemon=True).start()
 
 def upload_to_gemini(path, mime_type=None):
     """Uploads the given file to Gemini.
     """
     file = client.upload_file(path, mime_type=mime_type)
-    print(f"Uploaded file '{file.display_name}' as: {file.uri}")
+    logger.info("Uploaded file '%s' as: %s", file.display_name, file.uri)
     return file
 
-def wait_for_files_active(files):
-    """Waits for the given files to be active."""
-    print("Waiting for file processing...")
-    max_attempts = 6  # Reduced to 1 minute max (6 attempts * 10 seconds)
-    attempt = 0
+# Backoff schedule shared by the file-state pollers: short videos usually turn
+# ACTIVE within a second, so start with short polls and stay under 2 s
+_POLL_INITIAL_DELAY = 0.1
+_POLL_BACKOFF = 2.0
+_POLL_MAX_DELAY = 2.0
+
+def wait_for_files_active(files, timeout=60.0):
+    """Waits for the given files to be active.
     
-    for file in files:
-        while attempt < max_attempts:
-            try:
-                # Get file status directly from the file object
-                if file.state == "ACTIVE":
-                    print("\nFile is active!")
-                    return
-                elif file.state == "FAILED":
-                    raise Exception(f"File {file.name} failed to process")
+    Pending files are tracked by name, so duplicates are polled once, and each
+    polling round refreshes all of them concurrently with exponential backoff.
+    """
+    logger.info("Waiting for file processing...")
+    pending = {file.name: file for file in files}
+    if not pending:
+        return
+    
+    delay = _POLL_INITIAL_DELAY
+    deadline = time.monotonic() + timeout
+    
+    try:
+        with ThreadPoolExecutor(max_workers=min(len(pending), 8)) as executor:
+            while True:
+                for name, file in list(pending.items()):
+                    if file.state == "ACTIVE":
+                        del pending[name]
+                    elif file.state == "FAILED":
+                        raise Exception(f"File {name} failed to process")
                 
-                print(".", end="", flush=True)
-                time.sleep(10)
-                attempt += 1
+                if not pending:
+                    break
+                if time.monotonic() >= deadline:
+                    raise Exception(f"File processing timed out after {timeout:.0f} seconds")
                 
-                # Refresh the file status using the correct method
-                if attempt % 2 == 0:  # Check more frequently
-                    file = client.get_file(name=file.name)
-                    
-            except Exception as e:
-                print(f"\nError checking file status: {str(e)}")
-                raise Exception(f"File processing error: {str(e)}")
+                logger.debug("Waiting on %d file(s) for %.1fs", len(pending), delay)
+                time.sleep(delay)
+                delay = min(delay * _POLL_BACKOFF, _POLL_MAX_DELAY)
+                
+                names = list(pending)
+                refreshed = executor.map(lambda name: client.files.get(name=name), names)
+                pending.update(zip(names, refreshed))
+    except Exception as e:
+        logger.error("Error checking file status: %s", e)
+        raise Exception(f"File processing error: {str(e)}")
     
-    raise Exception("File processing timed out after 1 minute")
+    logger.info("All files are active!")
 
 def get_video_mime_type(file_path: Union[str, Path]) -> str:
     """
@@ -69,20 +268,41 @@ def get_video_mime_type(file_path: Union[str, Path]) -> str:
     Returns:
         str: MIME type for the video
     """
-    extension = Path(file_path).suffix.lower()
-    mime_types = {
-        '.mp4': 'video/mp4',
-        '.webm': 'video/webm',
-        '.mov': 'video/quicktime',
-        '.avi': 'video/x-msvideo',
-        '.mkv': 'video/x-matroska'
-    }
-    return mime_types.get(extension, 'video/mp4')
+    # Key the cache on the suffix: upload paths are unique, so a per-path
+    # cache would never hit
+    return _mime_for_suffix(os.path.splitext(str(file_path))[1].lower())
+
+@functools.lru_cache(maxsize=256)
+def _mime_for_suffix(suffix: str) -> str:
+    return _VIDEO_MIME_TYPES.get(suffix, 'video/mp4')
+
+# Parsers extract_json_from_response can end up relying on. Only _PARSED_JSON
+# results came from well-formed model output.
+_PARSED_JSON = "json"
+_PARSED_JSON_REPAIR = "json_repair"
+_PARSED_STRUCTURED = "structured"
 
-def clean_json_response(text):
-    """Clean the response text to ensure valid JSON."""
+def clean_json_response(text, json_blocks: Optional[List[str]] = None) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """Clean the response text to ensure valid JSON.
+    
+    Args:
+        text: The response text, or a JSON candidate extracted from it
+        json_blocks: ```json fence bodies the caller already found in text;
+            the text is scanned for them when None
+    
+    Returns:
+        The cleaned JSON text, the parsed object when cleaning already had to
+        parse it (None otherwise), and which parser produced it: _PARSED_JSON,
+        _PARSED_JSON_REPAIR, or None when nothing was parsed
+    """
+    # Fast path: already a valid JSON object
+    parsed = _parse_json_object(text, lenient=True)
+    if parsed is not None:
+        return text.strip(), parsed, _PARSED_JSON
+    
     # Find JSON blocks in markdown code blocks
-    json_blocks = re.findall(r'```json\s*(.*?)\s*```', text, re.DOTALL)
+    if json_blocks is None:
+        json_blocks = _find_json_fences(text)
     
     if json_blocks:
         # Combine multiple JSON blocks if they exist
@@ -90,37 +310,105 @@ def clean_json_response(text):
         for block in json_blocks:
             try:
                 # Parse each block
-                json_data = json.loads(block)
+                json_data = _fast_loads(block)
                 # Merge into combined_json
                 combined_json.update(json_data)
             except json.JSONDecodeError:
                 continue
         
         if combined_json:
-            return json.dumps(combined_json)
+            return orjson.dumps(combined_json).decode(), combined_json, _PARSED_JSON
     
     # Fallback to original method if no valid JSON blocks found
     json_start = text.find('{')
     json_end = text.rfind('}')
     if json_start >= 0 and json_end >= 0:
         text = text[json_start:json_end + 1]
+        
+        # The repairs below corrupt valid JSON, so only run them as a last
+        # resort; raw newlines in strings parse fine with strict=False
+        parsed = _parse_json_object(text, lenient=True)
+        if parsed is not None:
+            return text, parsed, _PARSED_JSON
     
-    # Fix common JSON formatting issues
-    text = text.replace('\n', ' ')
-    text = re.sub(r'(?<!\\)"(?!,|\s*}|\s*]|\s*:)', '\\"', text)  # Fix unescaped quotes
-    text = re.sub(r',\s*([}\]])', r'\1', text)  # Remove trailing commas
+    # Last resort: json_repair fixes unescaped quotes, trailing commas and
+    # similar model slips in one pass, without touching valid string content
+    repaired = repair_json(text, return_objects=True)
+    if isinstance(repaired, dict) and repaired:
+        return orjson.dumps(repaired).decode(), repaired, _PARSED_JSON_REPAIR
     
-    return text
+    return text, None, None
 
-def _build_analysis_prompt(video_url: str, is_url: bool = True, is_url_prompt: bool = None) -> str:
-    """Build the prompt for the video analysis."""
-    
-    # For backward compatibility - if is_url_prompt is provided, use it instead
-    if is_url_prompt is not None:
-        is_url = is_url_prompt
-    
-    # Define the JSON structure template separately to avoid nesting issues
-    json_structure = '''{
+# Everything after the first line of the analysis prompt; it is identical for
+# URL and uploaded-file analyses, so it is assembled once at import
+_ANALYSIS_PROMPT_BODY = """Your task is to provide a comprehensive analysis of this video advertisement. 
+Focus on its characteristics, appeal, and marketing effectiveness.
+
+Break down your analysis into these sections:
+1. Content Analysis: Briefly describe what's happening in the video
+2. Visual Analysis: Describe the predominant colors, shot types, lighting, and visual style
+3. Product Analysis: Identify the featured product or service and how it's presented
+4. Performance Metrics Prediction: Provide potential scores for attention, engagement, and retention
+5. Demographic Analysis: Analyze the demographic representation in the video
+6. Detailed Observations: Provide specific insights across multiple dimensions
+
+For the Content Analysis section:
+- Video Format: Identify what type of advertisement format this is.
+- Setting: Describe where the video takes place. 
+- Key Events: Summarize the main action or narrative arc.
+- Audio: Describe the use of music, voice, sound effects.
+- Text/Graphics: Note any on-screen text or graphics.
+
+For the Visual Analysis section:
+- Color Palette: Identify the main colors and their emotional impact.
+- Shot Types: Describe the predominant shot types (close-ups, wide shots, etc.).
+- Lighting: Analyze the lighting style and mood it creates.
+- Visual Style: Comment on the overall aesthetic approach.
+- Visual Quality: Assess the production value and visual clarity.
+
+For the Product Analysis section:
+- Featured Product: Name and describe the main product or service.
+- Brand Elements: Identify logos, slogans, or distinctive brand markers.
+- Product Presentation: How is the product showcased? Is it demonstrated?
+- Value Proposition: What benefits or solutions does the product appear to offer?
+- Call to Action: Is there a clear CTA? What is the viewer prompted to do?
+
+For the Performance Metrics Prediction section:
+- Attention Score (0-100): How likely is this to capture viewer attention in the first few seconds?
+- Engagement Potential (0-100): How likely is this to maintain viewer interest throughout?
+- Watch Time Retention (0-100%): What percentage of viewers would likely watch the entire video?
+- Key Strengths: List 3-5 elements that would drive positive performance.
+- Improvement Suggestions: List 3-5 potential changes that could enhance performance.
+
+For the Demographic Analysis section:
+- Total People Count: Count and provide the EXACT number of ALL people that appear in the video, even if just briefly or in the background.
+- Gender Distribution: Analyze how much of the video's screen time is populated by male faces vs. female faces (not the count of people, but their presence throughout the video). Only use male and female categories, with percentages that add up to 100%.
+- Age Distribution: Analyze the distribution of screen time across age groups throughout the video (0-17, 18-24, 25-34, 35-44, 45-64, 65+). Focus on how much of the video features each age group, not just counting individuals. Percentages should add up to 100%.
+- Ethnicity Distribution: Analyze the distribution of screen time across different ethnicities throughout the video. Focus on specific ethnicities (caucasian, black, hispanic, asian, middle_eastern) without using mixed or other categories. Report what percentage of the video's screen time features each ethnicity. Percentages should add up to 100%.
+- Screen Time Distribution: For videos with multiple people, calculate what percentage of total video screen time is given to main subjects, secondary subjects, and background appearances. Percentages should add up to 100%.
+- Representation Quality: Provide an assessment of overall demographic diversity and representation.
+
+For the Detailed Analysis section, include "In-depth Video Analysis" with these subsections:
+- Hook: Analyze the opening seconds and how effectively they grab attention.
+- Editing: Count the EXACT number of scene cuts/transitions in the video and calculate the average cuts per second. Describe the pacing, transitions, and overall editing style. For example "12 total cuts with approximately 0.5 cuts per second" or "8 total cuts with a cut every 3 seconds".
+- Tonality: Describe the emotional tone and mood of the advertisement. Identify the dominant emotions (e.g., happiness, sadness, excitement) present in the video and assign an approximate percentage to each emotion (should add up to 100%).
+- Viral Potential: Rate each aspect on a scale of 0-100:
+  * Visuals: Are they striking, unique, or highly appealing?
+  * Emotion: Does it evoke strong emotional responses?
+  * Shareability: Would viewers want to share this content?
+  * Relatability: How well would the target audience connect with this?
+  * Uniqueness: How different is this from typical ads in its category?
+- Core Strengths: Identify the strongest aspects in these categories:
+  * Visuals: What visual elements stand out positively?
+  * Content: What content elements are most compelling?
+  * Pacing: How well is the timing and rhythm executed?
+  * Value: How clearly is the value proposition conveyed?
+  * CTA: How effectively is the call to action presented?
+
+Organize your analysis to be detailed and insightful, while remaining objective. Use specific video timestamps and elements to support your observations.
+
+Use JSON format for your response. Here's the structure:
+{
   "analysis": {
     "Content Analysis": {
       "Video Format": "",
@@ -200,207 +488,159 @@ def _build_analysis_prompt(video_url: str, is_url: bool = True, is_url_prompt: b
       }
     }
   }
-}'''
-    
-    prompt = ""
-    if is_url:
-        prompt = f"""Analyze this video: {video_url}
-
-Your task is to provide a comprehensive analysis of this video advertisement. 
-Focus on its characteristics, appeal, and marketing effectiveness.
-
-Break down your analysis into these sections:
-1. Content Analysis: Briefly describe what's happening in the video
-2. Visual Analysis: Describe the predominant colors, shot types, lighting, and visual style
-3. Product Analysis: Identify the featured product or service and how it's presented
-4. Performance Metrics Prediction: Provide potential scores for attention, engagement, and retention
-5. Demographic Analysis: Analyze the demographic representation in the video
-6. Detailed Observations: Provide specific insights across multiple dimensions
-
-For the Content Analysis section:
-- Video Format: Identify what type of advertisement format this is.
-- Setting: Describe where the video takes place. 
-- Key Events: Summarize the main action or narrative arc.
-- Audio: Describe the use of music, voice, sound effects.
-- Text/Graphics: Note any on-screen text or graphics.
-
-For the Visual Analysis section:
-- Color Palette: Identify the main colors and their emotional impact.
-- Shot Types: Describe the predominant shot types (close-ups, wide shots, etc.).
-- Lighting: Analyze the lighting style and mood it creates.
-- Visual Style: Comment on the overall aesthetic approach.
-- Visual Quality: Assess the production value and visual clarity.
-
-For the Product Analysis section:
-- Featured Product: Name and describe the main product or service.
-- Brand Elements: Identify logos, slogans, or distinctive brand markers.
-- Product Presentation: How is the product showcased? Is it demonstrated?
-- Value Proposition: What benefits or solutions does the product appear to offer?
-- Call to Action: Is there a clear CTA? What is the viewer prompted to do?
-
-For the Performance Metrics Prediction section:
-- Attention Score (0-100): How likely is this to capture viewer attention in the first few seconds?
-- Engagement Potential (0-100): How likely is this to maintain viewer interest throughout?
-- Watch Time Retention (0-100%): What percentage of viewers would likely watch the entire video?
-- Key Strengths: List 3-5 elements that would drive positive performance.
-- Improvement Suggestions: List 3-5 potential changes that could enhance performance.
-
-For the Demographic Analysis section:
-- Total People Count: Count and provide the EXACT number of ALL people that appear in the video, even if just briefly or in the background.
-- Gender Distribution: Analyze how much of the video's screen time is populated by male faces vs. female faces (not the count of people, but their presence throughout the video). Only use male and female categories, with percentages that add up to 100%.
-- Age Distribution: Analyze the distribution of screen time across age groups throughout the video (0-17, 18-24, 25-34, 35-44, 45-64, 65+). Focus on how much of the video features each age group, not just counting individuals. Percentages should add up to 100%.
-- Ethnicity Distribution: Analyze the distribution of screen time across different ethnicities throughout the video. Focus on specific ethnicities (caucasian, black, hispanic, asian, middle_eastern) without using mixed or other categories. Report what percentage of the video's screen time features each ethnicity. Percentages should add up to 100%.
-- Screen Time Distribution: For videos with multiple people, calculate what percentage of total video screen time is given to main subjects, secondary subjects, and background appearances. Percentages should add up to 100%.
-- Representation Quality: Provide an assessment of overall demographic diversity and representation.
-
-For the Detailed Analysis section, include "In-depth Video Analysis" with these subsections:
-- Hook: Analyze the opening seconds and how effectively they grab attention.
-- Editing: Count the EXACT number of scene cuts/transitions in the video and calculate the average cuts per second. Describe the pacing, transitions, and overall editing style. For example "12 total cuts with approximately 0.5 cuts per second" or "8 total cuts with a cut every 3 seconds".
-- Tonality: Describe the emotional tone and mood of the advertisement. Identify the dominant emotions (e.g., happiness, sadness, excitement) present in the video and assign an approximate percentage to each emotion (should add up to 100%).
-- Viral Potential: Rate each aspect on a scale of 0-100:
-  * Visuals: Are they striking, unique, or highly appealing?
-  * Emotion: Does it evoke strong emotional responses?
-  * Shareability: Would viewers want to share this content?
-  * Relatability: How well would the target audience connect with this?
-  * Uniqueness: How different is this from typical ads in its category?
-- Core Strengths: Identify the strongest aspects in these categories:
-  * Visuals: What visual elements stand out positively?
-  * Content: What content elements are most compelling?
-  * Pacing: How well is the timing and rhythm executed?
-  * Value: How clearly is the value proposition conveyed?
-  * CTA: How effectively is the call to action presented?
-
-Organize your analysis to be detailed and insightful, while remaining objective. Use specific video timestamps and elements to support your observations.
-
-Use JSON format for your response. Here's the structure:
-{json_structure}
+}
 
 Ensure all demographic percentages add up to exactly 100% in each category. For Total People Count, provide an actual number, not a percentage.
 """
-    else:
-        prompt = f"""Analyze the previously uploaded video.
-
-Your task is to provide a comprehensive analysis of this video advertisement. 
-Focus on its characteristics, appeal, and marketing effectiveness.
 
-Break down your analysis into these sections:
-1. Content Analysis: Briefly describe what's happening in the video
-2. Visual Analysis: Describe the predominant colors, shot types, lighting, and visual style
-3. Product Analysis: Identify the featured product or service and how it's presented
-4. Performance Metrics Prediction: Provide potential scores for attention, engagement, and retention
-5. Demographic Analysis: Analyze the demographic representation in the video
-6. Detailed Observations: Provide specific insights across multiple dimensions
+_URL_PROMPT_PREFIX = "Analyze this video: "
+_FILE_ANALYSIS_PROMPT = "Analyze the previously uploaded video.\n\n" + _ANALYSIS_PROMPT_BODY
 
-For the Content Analysis section:
-- Video Format: Identify what type of advertisement format this is.
-- Setting: Describe where the video takes place. 
-- Key Events: Summarize the main action or narrative arc.
-- Audio: Describe the use of music, voice, sound effects.
-- Text/Graphics: Note any on-screen text or graphics.
+def _build_analysis_prompt(video_url: str, is_url: bool = True, is_url_prompt: bool = None) -> str:
+    """Build the prompt for the video analysis."""
+    
+    # For backward compatibility - if is_url_prompt is provided, use it instead
+    if is_url_prompt is not None:
+        is_url = is_url_prompt
+    
+    if is_url:
+        return f"{_URL_PROMPT_PREFIX}{video_url}\n\n{_ANALYSIS_PROMPT_BODY}"
+    return _FILE_ANALYSIS_PROMPT
 
-For the Visual Analysis section:
-- Color Palette: Identify the main colors and their emotional impact.
-- Shot Types: Describe the predominant shot types (close-ups, wide shots, etc.).
-- Lighting: Analyze the lighting style and mood it creates.
-- Visual Style: Comment on the overall aesthetic approach.
-- Visual Quality: Assess the production value and visual clarity.
+# The uploaded-file prompt does not depend on the input, so its Content is
+# built once; URL prompts embed the URL and are still built per call
+_FILE_PROMPT_CONTENT = types.Content(
+    role="user",
+    parts=[
+        types.Part.from_text(text=_FILE_ANALYSIS_PROMPT),
+    ],
+)
 
-For the Product Analysis section:
-- Featured Product: Name and describe the main product or service.
-- Brand Elements: Identify logos, slogans, or distinctive brand markers.
-- Product Presentation: How is the product showcased? Is it demonstrated?
-- Value Proposition: What benefits or solutions does the product appear to offer?
-- Call to Action: Is there a clear CTA? What is the viewer prompted to do?
+# Every request asks for a JSON response, so one config object is shared
+_GENERATE_CONTENT_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json",
+)
 
-For the Performance Metrics Prediction section:
-- Attention Score (0-100): How likely is this to capture viewer attention in the first few seconds?
-- Engagement Potential (0-100): How likely is this to maintain viewer interest throughout?
-- Watch Time Retention (0-100%): What percentage of viewers would likely watch the entire video?
-- Key Strengths: List 3-5 elements that would drive positive performance.
-- Improvement Suggestions: List 3-5 potential changes that could enhance performance.
+# Successful analyses are cached on disk, keyed by the video's content hash
+# (or its URL), so re-runs and retried jobs skip the upload and model call
+ANALYSIS_CACHE_DIR = os.getenv(
+    "GEMINI_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gemini_cache"),
+)
+_FILE_CACHE_TTL = 7 * 86400
+_URL_CACHE_TTL = 86400
+# Prompt changes must not serve results produced by the old prompt
+_CACHE_KEY_PREFIX = hashlib.sha256(_ANALYSIS_PROMPT_BODY.encode("utf-8")).hexdigest()[:12]
+_analysis_cache = Cache(ANALYSIS_CACHE_DIR)
 
-For the Demographic Analysis section:
-- Total People Count: Count and provide the EXACT number of ALL people that appear in the video, even if just briefly or in the background.
-- Gender Distribution: Analyze how much of the video's screen time is populated by male faces vs. female faces (not the count of people, but their presence throughout the video). Only use male and female categories, with percentages that add up to 100%.
-- Age Distribution: Analyze the distribution of screen time across age groups throughout the video (0-17, 18-24, 25-34, 35-44, 45-64, 65+). Focus on how much of the video features each age group, not just counting individuals. Percentages should add up to 100%.
-- Ethnicity Distribution: Analyze the distribution of screen time across different ethnicities throughout the video. Focus on specific ethnicities (caucasian, black, hispanic, asian, middle_eastern) without using mixed or other categories. Report what percentage of the video's screen time features each ethnicity. Percentages should add up to 100%.
-- Screen Time Distribution: For videos with multiple people, calculate what percentage of total video screen time is given to main subjects, secondary subjects, and background appearances. Percentages should add up to 100%.
-- Representation Quality: Provide an assessment of overall demographic diversity and representation.
+def _analysis_cache_key(path_or_url, is_url_prompt=False):
+    """Return the cache key for an input, or None if a file cannot be read."""
+    if is_url_prompt:
+        return f"{_CACHE_KEY_PREFIX}:url:{path_or_url.strip()}"
+    
+    digest = _content_hasher()
+    try:
+        with open(path_or_url, "rb") as f:
+            for block in iter(lambda: f.read(4 << 20), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    # The digest name keeps blake3 and sha256 keys apart
+    return f"{_CACHE_KEY_PREFIX}:file:{digest.name}:{digest.hexdigest()}"
 
-For the Detailed Analysis section, include "In-depth Video Analysis" with these subsections:
-- Hook: Analyze the opening seconds and how effectively they grab attention.
-- Editing: Count the EXACT number of scene cuts/transitions in the video and calculate the average cuts per second. Describe the pacing, transitions, and overall editing style. For example "12 total cuts with approximately 0.5 cuts per second" or "8 total cuts with a cut every 3 seconds".
-- Tonality: Describe the emotional tone and mood of the advertisement. Identify the dominant emotions (e.g., happiness, sadness, excitement) present in the video and assign an approximate percentage to each emotion (should add up to 100%).
-- Viral Potential: Rate each aspect on a scale of 0-100:
-  * Visuals: Are they striking, unique, or highly appealing?
-  * Emotion: Does it evoke strong emotional responses?
-  * Shareability: Would viewers want to share this content?
-  * Relatability: How well would the target audience connect with this?
-  * Uniqueness: How different is this from typical ads in its category?
-- Core Strengths: Identify the strongest aspects in these categories:
-  * Visuals: What visual elements stand out positively?
-  * Content: What content elements are most compelling?
-  * Pacing: How well is the timing and rhythm executed?
-  * Value: How clearly is the value proposition conveyed?
-  * CTA: How effectively is the call to action presented?
+def _get_cached_analysis(cache_key):
+    """Return the cached analysis for cache_key, or None."""
+    if cache_key is None:
+        return None
+    result = _analysis_cache.get(cache_key)
+    if result is not None:
+        logger.info("Using cached analysis for %s", cache_key)
+    return result
 
-Organize your analysis to be detailed and insightful, while remaining objective. Use specific video timestamps and elements to support your observations.
+def _cache_analysis(cache_key, result, parser, is_url_prompt=False):
+    """Store an analysis result parsed cleanly from the model's JSON.
+    
+    Results rebuilt by json_repair or the structured-text fallback are not
+    cached, so a malformed response is retried on the next call.
+    """
+    if parser != _PARSED_JSON:
+        logger.info("Not caching analysis recovered by the %s fallback", parser)
+        return
+    if cache_key is not None and result and "error" not in result:
+        _analysis_cache.set(cache_key, result, expire=_URL_CACHE_TTL if is_url_prompt else _FILE_CACHE_TTL)
 
-Use JSON format for your response. Here's the structure:
-{json_structure}
+def invalidate_analysis_cache(path_or_url, is_url_prompt=False):
+    """Drop the cached analysis for a video file or URL.
+    
+    Returns:
+        True if an entry was removed, False otherwise
+    """
+    cache_key = _analysis_cache_key(path_or_url, is_url_prompt)
+    return cache_key is not None and _analysis_cache.delete(cache_key)
 
-Ensure all demographic percentages add up to exactly 100% in each category. For Total People Count, provide an actual number, not a percentage.
-"""
-    return prompt
+def _missing_required_fields(data):
+    """Return the required fields absent (or null) in data, in order."""
+    missing = []
+    for parent_path, leaves in _REQUIRED_FIELD_GROUPS:
+        parent = data
+        for part in parent_path:
+            parent = parent.get(part) if isinstance(parent, dict) else None
+        if isinstance(parent, dict):
+            missing.extend(field for leaf, field in leaves if parent.get(leaf) is None)
+        else:
+            missing.extend(field for _, field in leaves)
+    return missing
 
 def extract_json_from_response(response_text):
     """Extracts and validates JSON from the response text."""
+    return _extract_json_and_parser(response_text)[0]
+
+def _extract_json_and_parser(response_text):
+    """extract_json_from_response, also returning the parser that succeeded.
+    
+    Returns:
+        A (result, parser) tuple; parser is _PARSED_JSON, _PARSED_JSON_REPAIR
+        or _PARSED_STRUCTURED
+    """
+    json_blocks = []
+    parser = _PARSED_JSON
+    json_str = None
     try:
-        # First try to extract JSON from markdown code blocks
-        json_blocks = re.findall(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-        if json_blocks:
-            # Use the first JSON block found
-            json_str = json_blocks[0]
-        else:
-            # Fallback to finding JSON object in plain text
-            # Look for the full JSON pattern with both open and close braces
-            pattern = r'\{[\s\S]*\}'
-            json_match = re.search(pattern, response_text)
-            if not json_match:
-                raise ValueError("No JSON found in response")
-            json_str = json_match.group()
+        # Fast path: the whole response is the JSON object
+        data = _parse_json_object(response_text)
         
-        # Clean the JSON string before parsing
-        json_str = clean_json_response(json_str)
-        
-        # Parse the JSON with more lenient settings
-        data = json.loads(json_str, strict=False)
-        
-        # Validate required fields with more flexible approach
-        required_fields = [
-            "Performance Metrics.Attention Score",
-            "Performance Metrics.Engagement Potential", 
-            "Performance Metrics.Watch Time Retention",
-            "Performance Metrics.Key Strengths",
-            "Performance Metrics.Improvement Suggestions",
-            "Detailed Analysis.In-depth Video Analysis.Hook",
-            "Detailed Analysis.In-depth Video Analysis.Editing",
-            "Detailed Analysis.In-depth Video Analysis.Tonality",
-            "Demographic Analysis.Gender Distribution",
-            "Demographic Analysis.Age Distribution",
-            "Demographic Analysis.Ethnicity Distribution",
-            "Demographic Analysis.Representation Quality"
-        ]
+        if data is None:
+            # First try to extract JSON from markdown code blocks
+            json_blocks = _find_json_fences(response_text)
+            if json_blocks:
+                # Use the first JSON block found
+                json_str = json_blocks[0]
+            else:
+                # Fallback to finding JSON object in plain text
+                json_str = find_balanced_json(response_text)
+                if json_str is None:
+                    # Unbalanced (e.g. truncated or malformed) output: take
+                    # everything between the outermost braces for cleanup
+                    json_start = response_text.find('{')
+                    json_end = response_text.rfind('}')
+                    if json_start < 0 or json_end < json_start:
+                        raise ValueError("No JSON found in response")
+                    json_str = response_text[json_start:json_end + 1]
+            
+            # Clean the JSON string before parsing; reuse its parse if it made
+            # one. The response was already scanned for fences, and a fence
+            # body or brace-delimited object cannot contain another fence.
+            json_str, data, parser = clean_json_response(json_str, json_blocks=[])
+            
+            if data is None:
+                # Parse the JSON with more lenient settings
+                data = _fast_loads(json_str)
+                parser = _PARSED_JSON
         
-        # Only check the fields that are essential
-        for field in required_fields:
-            parts = field.split('.')
-            current = data
-            for part in parts:
-                if part not in current:
-                    print(f"Warning: Missing field: {field}")
-                    break
-                current = current[part]
+        # Only check the fields that are essential; report them all at once
+        missing = _missing_required_fields(data)
+        if missing:
+            logger.warning("Missing fields: %s", ", ".join(missing))
         
         # Extract emotion percentages from Tonality if available
         if "Detailed Analysis" in data and "In-depth Video Analysis" in data["Detailed Analysis"]:
@@ -409,8 +649,8 @@ def extract_json_from_response(response_text):
                 # Extract emotion percentages from Tonality text
                 emotion_percentages = extract_emotions(
                     tonality, 
-                    r"(\d+%\s*[a-zA-Z]+|\b[a-zA-Z]+\s*\d+%)", 
-                    r"([\w\s]+):\s*(\d+)%"
+                    _RE_TONALITY_EMOTION_MENTION, 
+                    _RE_TONALITY_EMOTION_PAIR
                 )
                 
                 # Add emotion_percentages directly to the JSON
@@ -421,347 +661,573 @@ def extract_json_from_response(response_text):
                     }
                 
         # Get the detailed text by removing the JSON block and any markdown formatting
-        detailed_text = response_text
-        for block in json_blocks:
-            detailed_text = detailed_text.replace(f"```json{block}```", "")
-        detailed_text = detailed_text.strip()
+        if json_blocks:
+            detailed_text = _strip_json_fences(response_text).strip()
+        else:
+            detailed_text = response_text.strip()
         
         return {
             "analysis": data,
             "detailed_text": detailed_text
-        }
+        }, parser
         
     except json.JSONDecodeError as e:
-        print(f"JSON decode error: {str(e)}")
-        print(f"Attempted to parse: {json_str if 'json_str' in locals() else 'No JSON string found'}")
+        logger.warning("JSON decode error: %s", e)
+        logger.debug("Attempted to parse: %s", json_str or "No JSON string found")
         # Try to extract structured data when JSON parsing fails
         try:
             return {
                 "analysis": extract_structured_data(response_text),
                 "detailed_text": response_text
-            }
+            }, _PARSED_STRUCTURED
         except Exception as e2:
             raise ValueError(f"Invalid JSON in response: {str(e)}")
     except Exception as e:
-        print(f"Error processing response: {str(e)}")
-        print(f"Response text: {response_text}")
+        logger.error("Error processing response: %s", e)
+        logger.debug("Response text: %s", response_text)
         raise ValueError(f"Error processing response: {str(e)}")
 
-def wait_for_file_active(file, max_attempts=20, sleep_duration=3):
+def wait_for_file_active(file, timeout=60.0):
     """Wait for an uploaded file to become active before using it.
     
     Args:
         file: The uploaded file object
-        max_attempts: Maximum number of attempts before giving up
-        sleep_duration: Time to sleep between attempts in seconds
+        timeout: Maximum time to wait in seconds before giving up
         
     Returns:
         The updated file object once active
     """
-    print(f"Waiting for file {file.name} to become active...")
+    logger.info("Waiting for file %s to become active...", file.name)
+    
+    delay = _POLL_INITIAL_DELAY
+    deadline = time.monotonic() + timeout
+    attempt = 0
     
-    for attempt in range(max_attempts):
+    while time.monotonic() < deadline:
+        attempt += 1
         try:
             # Check file status by retrieving it again
             updated_file = client.files.get(name=file.name)
-            
-            # Print status information
-            print(f"Attempt {attempt+1}/{max_attempts}: File state is {updated_file.state}")
+        except Exception as e:
+            logger.warning("Error checking file status: %s", e)
+            # Continue trying despite errors
+            updated_file = None
+        
+        if updated_file is not None:
+            logger.debug("Attempt %d: File state is %s", attempt, updated_file.state)
             
             if updated_file.state == "ACTIVE":
-                print(f"✓ File is now active! ({attempt+1} attempts)")
+                logger.info("File is now active (%d attempts)", attempt)
                 return updated_file
-                
+            
             elif updated_file.state == "FAILED":
                 raise Exception(f"File processing failed: {updated_file.state_message}")
-                
-            # If still processing, wait and try again
-            print(f"Waiting {sleep_duration}s for file to become active...")
-            time.sleep(sleep_duration)
-            
-        except Exception as e:
-            print(f"Error checking file status: {e}")
-            # Continue trying despite errors
-            time.sleep(sleep_duration)
+        
+        # If still processing, back off and try again
+        time.sleep(delay)
+        delay = min(delay * _POLL_BACKOFF, _POLL_MAX_DELAY)
     
-    # If we get here, we've exceeded max attempts
-    raise Exception(f"Timed out waiting for file {file.name} to become active after {max_attempts} attempts")
+    raise Exception(f"Timed out waiting for file {file.name} to become active after {timeout:.0f} seconds")
 
-def analyze_video_with_gemini(path_or_url, is_url_prompt=False, max_retries=3, initial_retry_delay=2):
-    """Analyzes a video using Gemini 2.5 Pro with retry mechanism for server errors."""
-    retries = 0
-    retry_delay = initial_retry_delay
+# Characters of streamed text to collect before echoing them to the console
+_ECHO_BUFFER_SIZE = 4096
+
+def _generate_response_chunks(model, contents, config, chunks, stream_progress=False):
+    """Run a Gemini request, appending response text to chunks.
     
-    while retries <= max_retries:
-        try:
-            print(f"\nStarting analysis with Gemini (Attempt {retries + 1}/{max_retries + 1}):")
-            print(f"Input: {path_or_url}")
-            print(f"Is URL analysis: {is_url_prompt}")
+    By default a single non-streamed request is made. With stream_progress
+    the response is streamed and echoed to the console as it arrives.
+    Text received before an error stays in chunks. A streamed response is
+    cut off as soon as its first JSON object closes.
+    """
+    if not stream_progress:
+        response = client.models.generate_content(
+            model=model,
+            contents=contents,
+            config=config,
+        )
+        if response.text:
+            chunks.append(response.text)
+        return
+    
+    # Echo to the console in batches rather than one write per chunk
+    scanner = JsonObjectScanner()
+    echo_from = 0
+    echo_size = 0
+    try:
+        for chunk in client.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=config,
+        ):
+            if chunk.text:
+                chunks.append(chunk.text)
+                echo_size += len(chunk.text)
+                if echo_size >= _ECHO_BUFFER_SIZE:
+                    sys.stdout.write("".join(chunks[echo_from:]))
+                    echo_from = len(chunks)
+                    echo_size = 0
+                if scanner.feed(chunk.text) >= 0:
+                    break
+    finally:
+        sys.stdout.write("".join(chunks[echo_from:]))
+        sys.stdout.flush()
 
-            model = "gemini-2.5-pro-exp-03-25"
-            
+def _build_contents(file_uri, mime_type, is_url_prompt=False):
+    """Build the request contents: the video part followed by the prompt.
+    
+    For URL analyses file_uri is the video URL, which the prompt embeds.
+    """
+    if is_url_prompt:
+        prompt_content = types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(text=_build_analysis_prompt(file_uri, is_url_prompt=True)),
+            ],
+        )
+    else:
+        prompt_content = _FILE_PROMPT_CONTENT
+    
+    return [
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_uri(
+                    file_uri=file_uri,
+                    mime_type=mime_type,
+                ),
+            ],
+        ),
+        prompt_content,
+    ]
+
+def _request_raw_response(model, contents, label, stream_progress=False):
+    """Run one Gemini request and return its raw text.
+    
+    Args:
+        model: Gemini model name
+        contents: Request contents from _build_contents
+        label: "URL" or "File", used in log messages and the debug dump name
+        stream_progress: Stream the response and echo it to the console
+        
+    Returns:
+        A (raw_content, error) tuple; error is the exception raised during
+        generation (None on success), and raw_content holds whatever text
+        arrived before it
+    """
+    # The raw response is kept for debugging
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    raw_filename = f"raw_gemini_{label.lower()}_response_{timestamp}.txt"
+    
+    # Accumulate the response in memory; the copy on disk is written once,
+    # off the request path
+    chunks = []
+    error = None
+    error_msg = ""
+    try:
+        logger.info("Sending %s analysis request to Gemini...", label)
+        _generate_response_chunks(model, contents, _GENERATE_CONTENT_CONFIG, chunks, stream_progress)
+    except Exception as e:
+        error = e
+        error_msg = f"\n\nError during {label} generation: {str(e)}"
+        logger.error("Error during %s generation: %s", label, e)
+    
+    raw_content = "".join(chunks)
+    _save_raw_response(raw_filename, label, raw_content, error_msg)
+    return raw_content, error
+
+def _is_server_error(error):
+    """Whether error is a transient Gemini 500 worth retrying."""
+    return "500 INTERNAL" in str(error)
+
+def _is_retryable_analysis_error(error):
+    """Server errors and unparseable responses are retried."""
+    return isinstance(error, ValueError) or _is_server_error(error)
+
+def _log_retry(retry_state):
+    """tenacity before_sleep hook."""
+    logger.warning(
+        "%s. Retrying in %.1f seconds (attempt %d)...",
+        retry_state.outcome.exception(), retry_state.next_action.sleep, retry_state.attempt_number,
+    )
+
+def _retry_policy(max_retries, initial_retry_delay, retry):
+    """Retry arguments shared by the sync and async analysis paths.
+    
+    Waits double from initial_retry_delay up to 30 s, plus up to 0.5 s of
+    jitter; the last error is re-raised once max_retries retries are used.
+    """
+    return dict(
+        stop=stop_after_attempt(max_retries + 1),
+        wait=wait_exponential_jitter(initial=initial_retry_delay, max=30, jitter=0.5),
+        retry=retry_if_exception(retry),
+        before_sleep=_log_retry,
+        reraise=True,
+    )
+
+def _upload_and_build_contents(path):
+    """Upload a local video, wait for it to become active and build contents."""
+    logger.info("Uploading local file: %s", path)
+    uploaded_file = client.files.upload(file=path)
+    logger.info("Uploaded file as: %s", uploaded_file.uri)
+    
+    # Wait for the file to become active before proceeding
+    active_file = wait_for_file_active(uploaded_file)
+    return _build_contents(active_file.uri, active_file.mime_type)
+
+def _generate_and_extract(model, contents, label, stream_progress=False):
+    """Run one Gemini request and extract its JSON.
+    
+    Returns the (result, parser) pair from _extract_json_and_parser. Raises
+    the generation error for 500s, and ValueError when no JSON can be
+    extracted; other generation errors still get the partial text parsed.
+    """
+    raw_content, error = _request_raw_response(model, contents, label, stream_progress)
+    if error is not None and _is_server_error(error):
+        raise error
+    return _extract_json_and_parser(raw_content)
+
+def analyze_video_with_gemini(path_or_url, is_url_prompt=False, max_retries=3, initial_retry_delay=2, stream_progress=False):
+    """Analyzes a video using Gemini 2.5 Pro with retry mechanism for server errors.
+    
+    Uploads are retried on server errors and requests on server errors or
+    unparseable responses, each up to max_retries times; a request retry
+    reuses the uploaded file. Set stream_progress to stream the response and
+    echo it to the console. Successful results are served from the analysis
+    cache on repeat calls.
+    """
+    cache_key = _analysis_cache_key(path_or_url, is_url_prompt)
+    cached = _get_cached_analysis(cache_key)
+    if cached is not None:
+        return cached
+    
+    logger.info("Starting analysis with Gemini: %s (URL analysis: %s)", path_or_url, is_url_prompt)
+    model = "gemini-2.5-pro-exp-03-25"
+    
+    try:
+        if is_url_prompt:
+            label = "URL"
+            contents = _build_contents(path_or_url, "video/*", is_url_prompt=True)
+        else:
             # For file analysis, we need to use the client.files.upload method
-            if not is_url_prompt:
-                print("\nProcessing file analysis using direct file upload...")
-                try:
-                    # Upload the file directly using client.files.upload
-                    print(f"Uploading local file: {path_or_url}")
-                    uploaded_file = client.files.upload(file=path_or_url)
-                    print(f"Uploaded file as: {uploaded_file.uri}")
-                    
-                    # Wait for the file to become active before proceeding
-                    active_file = wait_for_file_active(uploaded_file)
-                    
-                    # Now use the uploaded file URI
-                    contents = [
-                        types.Content(
-                            role="user",
-                            parts=[
-                                types.Part.from_uri(
-                                    file_uri=active_file.uri,
-                                    mime_type=active_file.mime_type,
-                                ),
-                            ],
-                        ),
-                        types.Content(
-                            role="user",
-                            parts=[
-                                types.Part.from_text(text=_build_analysis_prompt(path_or_url, is_url_prompt=False)),
-                            ],
-                        ),
-                    ]
-                    
-                    # Configure generation config
-                    generate_content_config = types.GenerateContentConfig(
-                        response_mime_type="application/json",
-                    )
-                    
-                    # Save the raw response to a file
-                    timestamp = time.strftime("%Y%m%d_%H%M%S")
-                    raw_filename = f"raw_gemini_file_response_{timestamp}.txt"
-                    
-                    with open(raw_filename, "w", encoding="utf-8") as f:
-                        f.write("=== Raw Gemini File Response ===\n\n")
-                        
-                        try:
-                            # Use the generate_content_stream
-                            print("Sending file analysis request to Gemini...")
-                            for chunk in client.models.generate_content_stream(
-                                model=model,
-                                contents=contents,
-                                config=generate_content_config,
-                            ):
-                                if chunk.text:
-                                    f.write(chunk.text)
-                                    print(chunk.text, end="")  # Print to console as well
-                                    f.flush()  # Make sure it's written immediately
-                        except Exception as e:
-                            error_msg = f"\n\nError during file generation: {str(e)}"
-                            f.write(error_msg)
-                            print(error_msg)
-                            
-                            # Check if this is a server error (500) that we should retry
-                            if "500 INTERNAL" in str(e) and retries < max_retries:
-                                retries += 1
-                                actual_delay = retry_delay + (random.random() * 0.5)
-                                print(f"\nServer error detected. Retrying in {actual_delay:.1f} seconds (attempt {retries}/{max_retries})...")
-                                time.sleep(actual_delay)
-                                # Exponential backoff for next retry
-                                retry_delay = min(retry_delay * 2, 30)  # Cap at 30 seconds
-                                continue
-                        
-                        f.write("\n\n=== End of File Response ===")
-                    
-                    print(f"\nSaved raw file response to: {raw_filename}")
-                    
-                    # Load the file and return its content
-                    with open(raw_filename, "r", encoding="utf-8") as f:
-                        raw_content = f.read()
-                    
-                    # Try to extract JSON from the raw content
-                    try:
-                        result = extract_json_from_response(raw_content)
-                        if result:
-                            print("Successfully extracted JSON response from file upload")
-                            return result
-                    except Exception as e:
-                        # Check if this is a parsing error we should retry
-                        if retries < max_retries:
-                            retries += 1
-                            actual_delay = retry_delay + (random.random() * 0.5)
-                            print(f"\nJSON parsing error: {str(e)}. Retrying in {actual_delay:.1f} seconds (attempt {retries}/{max_retries})...")
-                            time.sleep(actual_delay)
-                            # Exponential backoff for next retry
-                            retry_delay = min(retry_delay * 2, 30)
-                            continue
-                        else:
-                            print(f"Error extracting JSON after {max_retries} retries: {str(e)}")
-                            return {"error": f"Failed to extract JSON after {max_retries} retries: {str(e)}"}
-                    
-                    return {"error": "Failed to extract valid JSON from file response"}
-                    
-                except Exception as upload_error:
-                    print(f"\nFile upload/processing failed: {str(upload_error)}")
-                    raise
-            elif is_url_prompt:
-                print("\nProcessing URL analysis...")
-                # Format the request for URL
-                contents = [
-                    types.Content(
-                        role="user",
-                        parts=[
-                            types.Part.from_uri(
-                                file_uri=path_or_url,
-                                mime_type="video/*",
-                            ),
-                        ],
-                    ),
-                    types.Content(
-                        role="user",
-                        parts=[
-                            types.Part.from_text(text=_build_analysis_prompt(path_or_url, is_url_prompt=True)),
-                        ],
-                    ),
-                ]
-                
-                # Configure generation config
-                generate_content_config = types.GenerateContentConfig(
-                    response_mime_type="application/json",
+            label = "File"
+            try:
+                contents = Retrying(**_retry_policy(max_retries, initial_retry_delay, _is_server_error))(
+                    _upload_and_build_contents, path_or_url
                 )
+            except Exception as upload_error:
+                logger.error("File upload/processing failed: %s", upload_error)
+                raise
+        
+        result, parser = Retrying(**_retry_policy(max_retries, initial_retry_delay, _is_retryable_analysis_error))(
+            _generate_and_extract, model, contents, label, stream_progress
+        )
+    except ValueError as e:
+        logger.error("Error extracting JSON after %d retries: %s", max_retries, e)
+        return {"error": f"Failed to extract JSON after {max_retries} retries: {str(e)}"}
+    except Exception as e:
+        logger.error("Error in analyze_video_with_gemini: %s", e)
+        return {"error": str(e)}
+    
+    logger.info("Successfully extracted JSON response from %s analysis", label)
+    _cache_analysis(cache_key, result, parser, is_url_prompt)
+    return result
 
-                # Save the raw response to a file
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                raw_filename = f"raw_gemini_url_response_{timestamp}.txt"
-                
-                with open(raw_filename, "w", encoding="utf-8") as f:
-                    f.write("=== Raw Gemini URL Response ===\n\n")
-                    
-                    try:
-                        # Use the generate_content_stream
-                        print("Sending URL request to Gemini...")
-                        for chunk in client.models.generate_content_stream(
-                            model=model,
-                            contents=contents,
-                            config=generate_content_config,
-                        ):
-                            if chunk.text:
-                                f.write(chunk.text)
-                                print(chunk.text, end="")  # Print to console as well
-                                f.flush()  # Make sure it's written immediately
-                    except Exception as e:
-                        error_msg = f"\n\nError during URL generation: {str(e)}"
-                        f.write(error_msg)
-                        print(error_msg)
-                        
-                        # Check if this is a server error (500) that we should retry
-                        if "500 INTERNAL" in str(e) and retries < max_retries:
-                            retries += 1
-                            # Add some jitter to retry delay
-                            actual_delay = retry_delay + (random.random() * 0.5)
-                            print(f"\nServer error detected. Retrying in {actual_delay:.1f} seconds (attempt {retries}/{max_retries})...")
-                            time.sleep(actual_delay)
-                            # Exponential backoff for next retry
-                            retry_delay = min(retry_delay * 2, 30)  # Cap at 30 seconds
-                            continue
-                    
-                    f.write("\n\n=== End of URL Response ===")
-                
-                print(f"\nSaved raw URL response to: {raw_filename}")
-                
-                # Load the file and return its content
-                with open(raw_filename, "r", encoding="utf-8") as f:
-                    raw_content = f.read()
-                
-                # Try to extract JSON from the raw content
-                try:
-                    result = extract_json_from_response(raw_content)
-                    if result:
-                        print("Successfully extracted JSON response from URL")
-                        return result
-                except Exception as e:
-                    # Check if this is a parsing error we should retry
-                    if retries < max_retries:
-                        retries += 1
-                        # Add some jitter to retry delay
-                        actual_delay = retry_delay + (random.random() * 0.5)
-                        print(f"\nJSON parsing error: {str(e)}. Retrying in {actual_delay:.1f} seconds (attempt {retries}/{max_retries})...")
-                        time.sleep(actual_delay)
-                        # Exponential backoff for next retry
-                        retry_delay = min(retry_delay * 2, 30)  # Cap at 30 seconds
-                        continue
-                    else:
-                        print(f"Error extracting JSON after {max_retries} retries: {str(e)}")
-                        return {"error": f"Failed to extract JSON after {max_retries} retries: {str(e)}"}
-                
-            # If we've reached here successfully, break the retry loop
-            break
-                
-        except Exception as e:
-            print(f"\nError in analyze_video_with_gemini: {str(e)}")
-            
-            # Check if we should retry
-            if "500 INTERNAL" in str(e) and retries < max_retries:
-                retries += 1
-                # Add some jitter to retry delay
-                actual_delay = retry_delay + (random.random() * 0.5)
-                print(f"\nServer error detected. Retrying in {actual_delay:.1f} seconds (attempt {retries}/{max_retries})...")
-                time.sleep(actual_delay)
-                # Exponential backoff for next retry
-                retry_delay = min(retry_delay * 2, 30)  # Cap at 30 seconds
-            else:
-                return {"error": str(e)}
+def _scan_structured_fields(text):
+    """Collect the first occurrence of each field/value kind in one pass.
+    
+    Returns a dict keyed by (field, kind), where kind is "str", "num" (bare
+    digits), "score" (digits, optionally quoted), "list" or "dict".
+    """
+    found = {}
+    for match in _RE_STRUCTURED_FIELD.finditer(text):
+        field, string, number, list_body, dict_body = match.groups()
+        if string is not None:
+            found.setdefault((field, "str"), string)
+            digits = _RE_LEADING_DIGITS.match(string)
+            if digits:
+                found.setdefault((field, "score"), digits.group())
+        elif number is not None:
+            found.setdefault((field, "num"), number)
+            found.setdefault((field, "score"), number)
+        elif list_body is not None:
+            found.setdefault((field, "list"), list_body)
+        else:
+            found.setdefault((field, "dict"), dict_body)
+    return found
+
+async def _wait_for_file_active_async(file, timeout=60.0):
+    """Async counterpart of wait_for_file_active, polling with backoff."""
+    delay = _POLL_INITIAL_DELAY
+    deadline = time.monotonic() + timeout
+    
+    while file.state != "ACTIVE":
+        if file.state == "FAILED":
+            raise Exception(f"File processing failed: {file.state_message}")
+        if time.monotonic() >= deadline:
+            raise Exception(f"Timed out waiting for file {file.name} to become active after {timeout:.0f} seconds")
+        await asyncio.sleep(delay)
+        delay = min(delay * _POLL_BACKOFF, _POLL_MAX_DELAY)
+        file = await client.aio.files.get(name=file.name)
+    
+    return file
+
+# Analyses currently running, keyed by (event loop, cache key), so concurrent
+# requests for the same video share one Gemini call
+_inflight_analyses: Dict[Tuple[asyncio.AbstractEventLoop, str], "asyncio.Task"] = {}
+
+async def analyze_video_with_gemini_async(path_or_url, is_url_prompt=False, max_retries=3, initial_retry_delay=2):
+    """Async variant of analyze_video_with_gemini for concurrent batches.
+    
+    Upload, file-state polling and generation all go through the SDK's async
+    client, so one event loop can overlap many analyses. A request for a
+    video that is already being analyzed waits for that analysis instead of
+    starting another.
+    """
+    # Hashing reads the whole file, so keep it off the event loop
+    cache_key = await asyncio.to_thread(_analysis_cache_key, path_or_url, is_url_prompt)
+    cached = _get_cached_analysis(cache_key)
+    if cached is not None:
+        return cached
+    
+    if cache_key is None:
+        return await _run_analysis_async(path_or_url, is_url_prompt, max_retries, initial_retry_delay, cache_key)
+    
+    loop = asyncio.get_running_loop()
+    inflight_key = (loop, cache_key)
+    task = _inflight_analyses.get(inflight_key)
+    if task is None:
+        task = loop.create_task(
+            _run_analysis_async(path_or_url, is_url_prompt, max_retries, initial_retry_delay, cache_key)
+        )
+        _inflight_analyses[inflight_key] = task
+        task.add_done_callback(lambda _: _inflight_analyses.pop(inflight_key, None))
+    else:
+        logger.info("Joining in-flight analysis of %s", path_or_url)
+    
+    # Shielded so one cancelled caller does not cancel the shared analysis
+    return await asyncio.shield(task)
+
+async def _run_analysis_async(path_or_url, is_url_prompt, max_retries, initial_retry_delay, cache_key):
+    """Upload (for files), request and parse one analysis, caching success."""
+    model = "gemini-2.5-pro-exp-03-25"
+    
+    try:
+        if is_url_prompt:
+            contents = _build_contents(path_or_url, "video/*", is_url_prompt=True)
+        else:
+            uploaded_file = await client.aio.files.upload(file=path_or_url)
+            logger.info("Uploaded file as: %s", uploaded_file.uri)
+            active_file = await _wait_for_file_active_async(uploaded_file)
+            contents = _build_contents(active_file.uri, active_file.mime_type)
+    except Exception as e:
+        logger.error("File upload/processing failed for %s: %s", path_or_url, e)
+        return {"error": str(e)}
+    
+    async def generate_and_extract():
+        response = await client.aio.models.generate_content(
+            model=model,
+            contents=contents,
+            config=_GENERATE_CONTENT_CONFIG,
+        )
+        return _extract_json_and_parser(response.text or "")
+    
+    try:
+        # Any request error is retried here, as before
+        result, parser = await AsyncRetrying(**_retry_policy(max_retries, initial_retry_delay, lambda error: True))(
+            generate_and_extract
+        )
+    except Exception as e:
+        logger.error("Error analyzing %s after %d retries: %s", path_or_url, max_retries, e)
+        return {"error": f"Failed to get valid response after {max_retries} retries: {str(e)}"}
+    
+    _cache_analysis(cache_key, result, parser, is_url_prompt)
+    return result
+
+async def _analyze_videos_gather(paths, is_url_prompt, concurrency):
+    """Analyze paths concurrently, at most concurrency at a time."""
+    # Gemini enforces per-project rate limits, so cap in-flight requests
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def analyze_one(path):
+        async with semaphore:
+            return await analyze_video_with_gemini_async(path, is_url_prompt=is_url_prompt)
+    
+    return await asyncio.gather(*(analyze_one(path) for path in paths))
+
+def analyze_videos_batch(paths, is_url_prompt=False, concurrency=8):
+    """Analyze several videos concurrently.
+    
+    Args:
+        paths: Local file paths, or URLs when is_url_prompt is True
+        is_url_prompt: Whether paths are URLs rather than local files
+        concurrency: Maximum number of analyses in flight at once
+        
+    Returns:
+        One result dict per path, in input order
+    """
+    return asyncio.run(_analyze_videos_gather(paths, is_url_prompt, concurrency))
+
+# Batch Mode only serves stable models, not the -exp preview used above
+_BATCH_MODEL = "gemini-2.5-pro"
+_BATCH_FINISHED_STATES = frozenset({
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+})
+
+def _batch_request_line(key, contents):
+    """Serialise one analysis request as a Batch Mode JSONL line."""
+    request = {
+        "contents": [
+            content.model_dump(mode="json", exclude_none=True, by_alias=True)
+            for content in contents
+        ],
+        "generationConfig": _GENERATE_CONTENT_CONFIG.model_dump(mode="json", exclude_none=True, by_alias=True),
+    }
+    return orjson.dumps({"key": key, "request": request}) + b"\n"
+
+def _batch_response_result(line):
+    """Turn one line of a Batch Mode results file into an analysis result."""
+    if "error" in line:
+        return {"error": f"Batch request failed: {line['error']}"}
     
-    # If we've exhausted retries
-    if retries >= max_retries:
-        return {"error": f"Failed to get valid response after {max_retries} retries"}
+    try:
+        parts = line["response"]["candidates"][0]["content"]["parts"]
+        response_text = "".join(part.get("text", "") for part in parts)
+        return extract_json_from_response(response_text)
+    except Exception as e:
+        return {"error": f"Failed to extract JSON from batch response: {str(e)}"}
+
+def analyze_videos_batch_mode(paths, is_url_prompt=False, poll_interval=30.0, timeout=24 * 3600):
+    """Analyze several videos as one Gemini Batch Mode job.
+    
+    Batch jobs cost half as much as interactive requests but finish
+    asynchronously, typically within minutes and at most within 24 hours.
+    Use this for bulk re-analyses; analyze_videos_batch is the low-latency
+    option.
+    
+    Args:
+        paths: Local file paths, or URLs when is_url_prompt is True
+        is_url_prompt: Whether paths are URLs rather than local files
+        poll_interval: Longest wait between job status checks, in seconds
+        timeout: Maximum time to wait for the job in seconds
+        
+    Returns:
+        One result dict per path, in input order
+    """
+    if not paths:
+        return []
+    
+    if is_url_prompt:
+        request_contents = [_build_contents(path, "video/*", is_url_prompt=True) for path in paths]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(paths), 8)) as executor:
+            uploaded = list(executor.map(lambda path: client.files.upload(file=path), paths))
+        wait_for_files_active(uploaded)
+        request_contents = [_build_contents(file.uri, file.mime_type) for file in uploaded]
+    
+    # Keys are input positions, so repeated paths keep separate results
+    requests_path = Path(f"batch_requests_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+    try:
+        with open(requests_path, "wb") as f:
+            for index, contents in enumerate(request_contents):
+                f.write(_batch_request_line(str(index), contents))
+        
+        requests_file = client.files.upload(
+            file=str(requests_path),
+            config=types.UploadFileConfig(display_name=requests_path.name, mime_type="jsonl"),
+        )
+    finally:
+        requests_path.unlink(missing_ok=True)
+    
+    job = client.batches.create(
+        model=_BATCH_MODEL,
+        src=requests_file.name,
+        config={"display_name": requests_path.stem},
+    )
+    logger.info("Submitted batch job %s with %d requests", job.name, len(paths))
+    
+    # Small jobs can finish in seconds, so back off up to poll_interval
+    delay = min(5.0, poll_interval)
+    deadline = time.monotonic() + timeout
+    while job.state.name not in _BATCH_FINISHED_STATES:
+        if time.monotonic() >= deadline:
+            logger.error("Batch job %s did not finish within %.0f seconds", job.name, timeout)
+            return [{"error": f"Batch job {job.name} timed out"} for _ in paths]
+        time.sleep(delay)
+        delay = min(delay * 2, poll_interval)
+        job = client.batches.get(name=job.name)
+        logger.debug("Batch job %s state: %s", job.name, job.state.name)
+    
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        logger.error("Batch job %s ended in state %s", job.name, job.state.name)
+        return [{"error": f"Batch job {job.name} ended in state {job.state.name}"} for _ in paths]
+    
+    results = {}
+    for raw_line in client.files.download(file=job.dest.file_name).splitlines():
+        if raw_line.strip():
+            line = orjson.loads(raw_line)
+            results[line.get("key")] = _batch_response_result(line)
+    
+    return [
+        results.get(str(index), {"error": "No result returned for this request"})
+        for index in range(len(paths))
+    ]
 
 def extract_structured_data(text):
     """
     Extract structured data from the response when JSON parsing fails.
     Falls back to a more lenient parsing approach.
     """
+    found = _scan_structured_fields(text)
+    
+    def value(field, kind="str"):
+        return found.get((field, kind), "")
+    
     # Define the structure we expect
     structure = {
         "Performance Metrics": {
-            "Attention Score": extract_value(text, r"Attention Score\"?\s*:\s*\"?(\d+)"),
-            "Engagement Potential": extract_value(text, r"Engagement Potential\"?\s*:\s*\"?(\d+)"),
-            "Watch Time Retention": extract_value(text, r"Watch Time Retention\"?\s*:\s*\"?(\d+)%?"),
-            "Key Strengths": extract_list(text, r"Key Strengths\"?\s*:\s*\[(.*?)\]"),
-            "Improvement Suggestions": extract_list(text, r"Improvement Suggestions\"?\s*:\s*\[(.*?)\]")
+            "Attention Score": value("Attention Score", "score"),
+            "Engagement Potential": value("Engagement Potential", "score"),
+            "Watch Time Retention": value("Watch Time Retention", "score"),
+            "Key Strengths": _parse_list_items(found.get(("Key Strengths", "list"))),
+            "Improvement Suggestions": _parse_list_items(found.get(("Improvement Suggestions", "list")))
         },
         "Demographic Analysis": {
-            "Gender Distribution": extract_demographics(text, r"Gender Distribution\"?\s*:\s*\{(.*?)\}"),
-            "Age Distribution": extract_demographics(text, r"Age Distribution\"?\s*:\s*\{(.*?)\}"),
-            "Ethnicity Distribution": extract_demographics(text, r"Ethnicity Distribution\"?\s*:\s*\{(.*?)\}"),
-            "Representation Quality": extract_value(text, r"Representation Quality\"?\s*:\s*\"([^\"]+)")
+            "Gender Distribution": _parse_demographic_pairs(found.get(("Gender Distribution", "dict"))),
+            "Age Distribution": _parse_demographic_pairs(found.get(("Age Distribution", "dict"))),
+            "Ethnicity Distribution": _parse_demographic_pairs(found.get(("Ethnicity Distribution", "dict"))),
+            "Representation Quality": value("Representation Quality")
         },
         "Detailed Analysis": {
             "In-depth Video Analysis": {
-                "Hook": extract_value(text, r"Hook\"?\s*:\s*\"([^\"]+)"),
-                "Editing": extract_value(text, r"Editing\"?\s*:\s*\"([^\"]+)"),
-                "Tonality": extract_value(text, r"Tonality\"?\s*:\s*\"([^\"]+)"),
-                "Emotion Percentages": extract_emotions(text, r"Tonality\"?\s*:.*?(\d+%\s*[a-zA-Z]+|\b[a-zA-Z]+\s*\d+%)", r"Tonality\"?\s*:.*?([\w\s]+):\s*(\d+)%"),
+                "Hook": value("Hook"),
+                "Editing": value("Editing"),
+                "Tonality": value("Tonality"),
+                "Emotion Percentages": extract_emotions(text, _RE_STRUCTURED_TONALITY_MENTION, _RE_STRUCTURED_TONALITY_PAIR),
                 "Core Strengths": {
-                    "Visuals": extract_value(text, r"Visuals\"?\s*:\s*\"([^\"]+)"),
-                    "Content": extract_value(text, r"Content\"?\s*:\s*\"([^\"]+)"),
-                    "Pacing": extract_value(text, r"Pacing\"?\s*:\s*\"([^\"]+)"),
-                    "Value": extract_value(text, r"Value\"?\s*:\s*\"([^\"]+)"),
-                    "CTA": extract_value(text, r"CTA\"?\s*:\s*\"([^\"]+)")
+                    "Visuals": value("Visuals"),
+                    "Content": value("Content"),
+                    "Pacing": value("Pacing"),
+                    "Value": value("Value"),
+                    "CTA": value("CTA")
                 },
                 "Viral Potential": {
-                    "Overall": extract_value(text, r"Overall\"?\s*:\s*\"([^\"]+)"),
+                    "Overall": value("Overall"),
                     "Scores": {
-                        "Visuals": extract_value(text, r"Visuals\"?\s*:\s*(\d+)"),
-                        "Emotional_Impact": extract_value(text, r"Emotional_Impact\"?\s*:\s*(\d+)"),
-                        "Shareability": extract_value(text, r"Shareability\"?\s*:\s*(\d+)"),
-                        "Relatability": extract_value(text, r"Relatability\"?\s*:\s*(\d+)"),
-                        "Uniqueness": extract_value(text, r"Uniqueness\"?\s*:\s*(\d+)")
+                        "Visuals": value("Visuals", "num"),
+                        "Emotional_Impact": value("Emotional_Impact", "num"),
+                        "Shareability": value("Shareability", "num"),
+                        "Relatability": value("Relatability", "num"),
+                        "Uniqueness": value("Uniqueness", "num")
                     }
                 },
                 "Platform Recommendations": {
-                    "Instagram": extract_value(text, r"Instagram\"?\s*:\s*\"([^\"]+)"),
-                    "TikTok": extract_value(text, r"TikTok\"?\s*:\s*\"([^\"]+)"),
-                    "YouTube Shorts": extract_value(text, r"YouTube Shorts\"?\s*:\s*\"([^\"]+)")
+                    "Instagram": value("Instagram"),
+                    "TikTok": value("TikTok"),
+                    "YouTube Shorts": value("YouTube Shorts")
                 }
             }
         }
@@ -770,30 +1236,47 @@ def extract_structured_data(text):
     return structure
 
 def extract_value(text, pattern):
-    """Extract a single value using regex."""
-    match = re.search(pattern, text)
+    """Extract a single value using a compiled regex."""
+    match = pattern.search(text)
     return match.group(1) if match else ""
 
 def extract_list(text, pattern):
-    """Extract a list of values using regex."""
-    match = re.search(pattern, text)
-    if not match:
+    """Extract a list of values using a compiled regex."""
+    match = pattern.search(text)
+    return _parse_list_items(match.group(1) if match else None)
+
+def _parse_list_items(content):
+    """Split the body of a JSON-ish list into stripped string items.
+    
+    Well-formed bodies are parsed as a JSON array, so items may contain
+    commas; anything else falls back to splitting on commas.
+    """
+    if not content:
         return []
     
-    items = match.group(1).split(',')
+    try:
+        items = orjson.loads(f"[{content}]")
+    except orjson.JSONDecodeError:
+        items = None
+    if items is not None and all(isinstance(item, str) for item in items):
+        return [item.strip() for item in items if item.strip()]
+    
+    items = content.split(',')
     return [item.strip().strip('"') for item in items if item.strip()]
 
 def extract_demographics(text, pattern):
-    """Extract demographic distribution using regex."""
-    match = re.search(pattern, text)
-    if not match:
-        return {}
-    
+    """Extract demographic distribution using a compiled regex."""
+    match = pattern.search(text)
     # Get the content inside the curly braces
-    content = match.group(1)
+    return _parse_demographic_pairs(match.group(1) if match else None)
+
+def _parse_demographic_pairs(content):
+    """Parse the body of a JSON-ish distribution object into a dict."""
+    if content is None:
+        return {}
     
     # Find all key-value pairs
-    pairs = re.findall(r'\"?([\w\s\-\+]+)\"?\s*:\s*\"?(\d+(?:\.\d+)?)\"?', content)
+    pairs = _RE_DEMOGRAPHIC_PAIR.findall(content)
     
     # Convert to a dictionary
     result = {}
@@ -810,18 +1293,18 @@ def extract_demographics(text, pattern):
     return result
 
 def extract_emotions(text, pattern1, pattern2):
-    """Extract emotion percentages from tonality section using regex."""
+    """Extract emotion percentages from tonality section using compiled regexes."""
     emotions = {}
     
     # First method: Look for structured emotion: percentage pattern
-    matches = re.findall(pattern2, text)
+    matches = pattern2.findall(text)
     if matches:
         for emotion, percentage in matches:
             emotions[emotion.strip()] = int(percentage)
         return emotions
     
     # Second method: Look for percentage and emotion mentions 
-    matches = re.findall(pattern1, text)
+    matches = pattern1.findall(text)
     if matches:
         for match in matches:
             # Parse out the emotion and percentage
@@ -934,7 +1417,8 @@ def test_analysis(file_path=None):
         traceback.print_exc()
 
 if __name__ == "__main__":
-    import sys
+    # Show the analyzer's progress messages when run as a script
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     # Check if a file path is provided as a command-line argument
     if len(sys.argv) > 1:
@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongodb_storage
+from mongodb_storage import MongoDBStorage
+
+class ReplayLocalFallbackTest(unittest.TestCase):
+    """Runs against the MongoDB at MONGODB_URI, in a throwaway collection."""
+
+    def setUp(self):
+        self.fallback_dir = tempfile.TemporaryDirectory()
+        self.saved = (mongodb_storage.FALLBACK_DIR, mongodb_storage.MONGODB_ANALYSES_COLLECTION)
+        mongodb_storage.FALLBACK_DIR = self.fallback_dir.name
+        mongodb_storage.MONGODB_ANALYSES_COLLECTION = f"test_analyses_{uuid.uuid4().hex[:8]}"
+        self._reset_storage()
+        try:
+            self.collection = MongoDBStorage.get_collection()
+            self.collection.database.client.admin.command("ping")
+        except Exception as e:
+            self._restore()
+            self.skipTest(f"MongoDB not reachable: {e}")
+
+    def tearDown(self):
+        self.collection.drop()
+        self._restore()
+
+    def _reset_storage(self):
+        MongoDBStorage.close_connection()
+        MongoDBStorage._indexes_ensured = False
+        MongoDBStorage._index_retry_at = 0.0
+        with mongodb_storage._read_cache_lock:
+            mongodb_storage._read_cache.clear()
+
+    def _restore(self):
+        mongodb_storage.FALLBACK_DIR, mongodb_storage.MONGODB_ANALYSES_COLLECTION = self.saved
+        self._reset_storage()
+        self.fallback_dir.cleanup()
+
+    def _write_fallback(self, analysis_id, timestamp, analysis_data):
+        mongodb_storage._write_local_analysis({
+            "id": analysis_id,
+            "content_name": "video",
+            "timestamp": timestamp,
+            "analysis_data": analysis_data
+        })
+
+    def test_replay_restores_missing_document(self):
+        self._write_fallback("video_1", datetime.now(timezone.utc), {"score": 1})
+
+        self.assertEqual(MongoDBStorage.replay_local_fallback(), 1)
+        self.assertEqual(self.collection.find_one({"id": "video_1"})["analysis_data"], {"score": 1})
+        self.assertEqual(os.listdir(self.fallback_dir.name), [])
+
+    def test_replay_is_noop_when_newer_document_exists(self):
+        self._write_fallback("video_1", datetime.now(timezone.utc) - timedelta(minutes=5), {"score": 1})
+        MongoDBStorage.save_analysis({"score": 2}, "video", analysis_id="video_1")
+
+        self.assertEqual(MongoDBStorage.replay_local_fallback(), 0)
+        self.assertEqual(self.collection.count_documents({"id": "video_1"}), 1)
+        self.assertEqual(self.collection.find_one({"id": "video_1"})["analysis_data"], {"score": 2})
+        self.assertEqual(os.listdir(self.fallback_dir.name), [])
+
+if __name__ == "__main__":
+    unittest.main()